@@ -31,7 +31,7 @@ const LambdaVisualizer = () => {
             }
         });
 
-        wsClient.current.onMessage('job_update', (data) => {
+        const handleJobUpdate = (data) => {
             setCurrentJob(data);
             setIsProcessing(data.status === 'running');
             
@@ -43,6 +43,13 @@ const LambdaVisualizer = () => {
                     setJobHistory(prev => [data, ...prev.slice(0, 9)]); // Keep last 10 jobs
                 }
             }
+        };
+
+        wsClient.current.onMessage('job_update', handleJobUpdate);
+
+        // Progress updates coalesced by the server (latest state of each job)
+        wsClient.current.onMessage('job_update_batch', (data) => {
+            data.jobs.forEach(handleJobUpdate);
         });
 
         wsClient.current.onMessage('job_completed', (data) => {
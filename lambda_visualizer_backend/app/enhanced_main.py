@@ -261,14 +261,8 @@ class EnhancedLambdaVisualizer:
                 return jsonify({
                     'success': True,
                     'jobs': [
-                        {
-                            'job_id': job.job_id,
-                            'job_type': job.job_type,
-                            'status': job.status.value,
-                            'progress': job.progress,
-                            'created_at': job.created_at.isoformat(),
-                            'input_data': job.input_data
-                        }
+                        job.to_json_dict(('job_id', 'job_type', 'status', 'progress',
+                                          'created_at', 'input_data'))
                         for job in jobs[:limit]
                     ]
                 })
@@ -465,7 +459,11 @@ class EnhancedLambdaVisualizer:
             # Step 3: Generate final video if needed (90%)
             final_video_path = None
             
-            if animation_result["success"] and animation_result.get("frames"):
+            if animation_result["success"] and animation_result.get("video_path"):
+                # Manim already encoded the animation
+                final_video_path = animation_result["video_path"]
+            elif animation_result["success"] and animation_result.get("frames"):
+                # Fallback frames: encode them here
                 video_result = self.video_output.frames_to_video(
                     animation_result["frames"],
                     f"lambda_viz_{job_id}",
@@ -567,7 +565,11 @@ class EnhancedLambdaVisualizer:
             # Step 3: Generate video (100%)
             final_video_path = None
             
-            if animation_result["success"] and animation_result.get("frames"):
+            if animation_result["success"] and animation_result.get("video_path"):
+                # Manim already encoded the animation
+                final_video_path = animation_result["video_path"]
+            elif animation_result["success"] and animation_result.get("frames"):
+                # Fallback frames: encode them here
                 video_result = self.video_output.frames_to_video(
                     animation_result["frames"],
                     f"lambda_viz_{job_id}",
@@ -20,16 +20,32 @@ from typing import Dict, List, Any, Optional
 from dataclasses import dataclass, asdict
 import threading
 import time
+import itertools
+import functools
+import os
+import concurrent.futures
+import multiprocessing
 
 # Import our solutions
 from utils.real_integrations import RealManimIntegration, RealGPUAcceleration, RealVideoOutput
-from utils.persistence_system import PersistenceManager, JobManager, JobStatus, JobPriority
-from utils.complete_beta_reduction import BetaReducer, LambdaParser, ReductionStrategy
-from utils.websocket_communication import LambdaVisualizerWebSocketServer, MessageType
+from utils.persistence_system import PersistenceManager, JobManager, JobRecord, JobStatus, JobPriority
+from utils.reduce_worker import reduce_worker, init_reduce_worker
+from utils.websocket_communication import LambdaVisualizerWebSocketServer, MessageType, ProgressNotifier
 
-# Flask integration
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+# ASGI API (Quart: Flask API on asyncio, served by uvicorn in the same event loop)
+from quart import Quart, request, jsonify, g
+from quart.json.provider import DefaultJSONProvider
+from quart_cors import cors
+import uvicorn
+
+from utils.json_encoding import json_dumps, json_loads
+
+# uvloop (optional): event loop più veloce per WebSocket e API REST
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -45,21 +61,54 @@ class SystemConfiguration:
     websocket_host: str = "localhost"
     websocket_port: int = 8765
     
-    # Flask API
+    # REST API
     api_host: str = "localhost"
     api_port: int = 5000
     
     # Processing
-    max_concurrent_jobs: int = 4
+    max_concurrent_jobs: int = 4  # Job in corso (fasi diverse si sovrappongono)
+    max_concurrent_renders: int = 1  # Fase Manim/FFmpeg (GPU)
     job_timeout_seconds: int = 300
     
     # Output
     output_directory: str = "./output"
     video_quality: str = "high"
+    hardware_encoding: bool = True  # NVENC se disponibile; False forza libx264
     
     # Beta reduction
     max_reduction_steps: int = 1000
     default_strategy: str = "normal_order"
+    fast_reduction: bool = False  # reduce_fast: niente passi intermedi nel risultato
+
+# Campi di JobRecord esposti da /api/jobs (più "result" ed "error")
+JOB_STATUS_FIELDS = ("job_id", "status", "progress", "created_at", "started_at", "completed_at")
+
+def ttl_cache(seconds: float):
+    """Memoizza una funzione senza argomenti per `seconds` secondi."""
+    
+    def decorator(func):
+        value, expires_at = None, 0.0
+        
+        @functools.wraps(func)
+        def wrapper():
+            nonlocal value, expires_at
+            now = time.monotonic()
+            if now >= expires_at:
+                value, expires_at = func(), now + seconds
+            return value
+        
+        return wrapper
+    
+    return decorator
+
+class SharedJSONProvider(DefaultJSONProvider):
+    """Provider JSON di Quart basato sull'encoder condiviso (orjson se presente)."""
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return json_dumps(obj)
+    
+    def loads(self, s, **kwargs: Any) -> Any:
+        return json_loads(s)
 
 class ProductionLambdaVisualizer:
     """Sistema Lambda Visualizer pronto per la produzione."""
@@ -71,82 +120,122 @@ class ProductionLambdaVisualizer:
         self.persistence_manager = PersistenceManager(self.config.database_path)
         self.job_manager = JobManager(self.persistence_manager)
         
+        # Output directories, resolved once
+        self.manim_dir = Path(self.config.output_directory) / "manim"
+        self.videos_dir = Path(self.config.output_directory) / "videos"
+        
         # Integration components
-        self.manim_integration = RealManimIntegration(
-            str(Path(self.config.output_directory) / "manim")
-        )
+        self.manim_integration = RealManimIntegration(str(self.manim_dir))
         self.gpu_acceleration = RealGPUAcceleration()
-        self.video_output = RealVideoOutput(
-            str(Path(self.config.output_directory) / "videos")
+        self.video_output = RealVideoOutput(str(self.videos_dir), self.config.hardware_encoding)
+        
+        # Beta reduction is CPU-bound pure Python: run it in worker processes
+        # Each worker is pinned to one core and, with fast_reduction, compiles
+        # the Numba kernels once at startup. forkserver starts workers from a
+        # clean process instead of forking the running server state. The worker
+        # functions live in utils.reduce_worker; the fork server preloads only
+        # it and the reducer, so workers start with what reduce_worker needs
+        # and without the server stack (quart, manim, cupy, av).
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            mp_context = multiprocessing.get_context("forkserver")
+            mp_context.set_forkserver_preload(
+                ["utils.reduce_worker", "utils.complete_beta_reduction"]
+            )
+        else:
+            mp_context = multiprocessing.get_context()
+        self.cpu_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=mp_context,
+            initializer=init_reduce_worker,
+            initargs=(mp_context.Value('i', 0), self.config.fast_reduction)
         )
         
-        # Processing components
-        self.lambda_parser = LambdaParser()
-        self.beta_reducer = BetaReducer(
-            ReductionStrategy(self.config.default_strategy)
-        )
+        # Reduction is pure: memoize it by expression
+        self._reduce_cached = functools.lru_cache(maxsize=1024)(self._reduce_expression)
         
         # WebSocket server
         self.websocket_server = LambdaVisualizerWebSocketServer(
             self.config.websocket_host,
             self.config.websocket_port
         )
-        
-        # Flask API
-        self.flask_app = self._create_flask_app()
-        
-        # Worker management
-        self.workers = []
+        self.progress_notifier = ProgressNotifier(self.websocket_server.manager)
+        
+        # REST API (ASGI, served on the system event loop)
+        self.api_app = self._create_api_app()
+        self.api_server: Optional[uvicorn.Server] = None
+        self.api_task: Optional[asyncio.Task] = None
+        
+        # Job execution: admission is bounded by max_concurrent_jobs, each
+        # phase by the resource it uses (reduction processes, renderer)
+        self.dispatcher_task: Optional[asyncio.Task] = None
+        self.job_tasks = set()
+        self.job_slots = asyncio.Semaphore(self.config.max_concurrent_jobs)
+        self.reduction_semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+        self.render_semaphore = asyncio.Semaphore(self.config.max_concurrent_renders)
         self.shutdown_event = threading.Event()
         
+        # Job dispatch: (-priority, sequence, JobRecord), fed by the submit paths
+        self.job_queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._job_sequence = itertools.count()
+        
         # Register WebSocket handlers
         self._register_websocket_handlers()
         
         logger.info("🚀 Production Lambda Visualizer initialized")
     
-    def _create_flask_app(self) -> Flask:
-        """Crea l'applicazione Flask."""
+    def _create_api_app(self) -> Quart:
+        """Crea l'applicazione REST (Quart, ASGI)."""
+        
+        app = cors(Quart(__name__))
+        app.json = SharedJSONProvider(app)
+        
+        @app.before_request
+        async def stamp_request():
+            """Timestamp ISO calcolato una sola volta per richiesta."""
+            g.now_iso = datetime.now().isoformat()
+        
+        # Polled by dashboards: recompute at most once per second
+        @ttl_cache(seconds=1.0)
+        def health_components():
+            return {
+                "database": "connected",
+                "manim": "available" if self.manim_integration.manim_available else "fallback",
+                "gpu": self.gpu_acceleration.device_info["type"],
+                "websocket": "running"
+            }
         
-        app = Flask(__name__)
-        CORS(app)
+        @ttl_cache(seconds=1.0)
+        def system_statistics():
+            return self.job_manager.get_job_statistics()
         
         @app.route('/health', methods=['GET'])
-        def health_check():
+        async def health_check():
             """Health check endpoint."""
             return jsonify({
                 "status": "healthy",
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": g.now_iso,
                 "version": "1.0.0-production",
-                "components": {
-                    "database": "connected",
-                    "manim": "available" if self.manim_integration.manim_available else "fallback",
-                    "gpu": self.gpu_acceleration.device_info["type"],
-                    "websocket": "running"
-                }
+                "components": health_components()
             })
         
         @app.route('/api/analyze', methods=['POST'])
-        def analyze_expression():
+        async def analyze_expression():
             """Analizza un'espressione lambda."""
             
-            data = request.get_json()
+            data = await request.get_json()
             if not data or 'expression' not in data:
                 return jsonify({"error": "Missing expression"}), 400
             
             try:
-                # Parse expression
-                term = self.lambda_parser.parse(data['expression'])
-                
-                # Perform beta reduction
-                reduction_result = self.beta_reducer.reduce(
-                    term,
-                    max_steps=data.get('max_steps', 100)
+                # Parse and reduce (cached by expression)
+                reduction_result = await asyncio.get_running_loop().run_in_executor(
+                    None, self._reduce_cached, data['expression'], data.get('max_steps', 100)
                 )
                 
                 return jsonify({
                     "success": True,
                     "analysis": reduction_result,
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": g.now_iso
                 })
                 
             except Exception as e:
@@ -154,26 +243,30 @@ class ProductionLambdaVisualizer:
                 return jsonify({"error": str(e)}), 400
         
         @app.route('/api/jobs', methods=['POST'])
-        def submit_job():
+        async def submit_job():
             """Sottomette un job di visualizzazione."""
             
-            data = request.get_json()
+            data = await request.get_json()
             if not data or 'expression' not in data:
                 return jsonify({"error": "Missing expression"}), 400
             
             try:
-                job_id = self.job_manager.create_job(
+                job = self.job_manager.create_job_record(
                     job_type="lambda_visualization",
                     input_data=data,
                     priority=JobPriority(data.get('priority', JobPriority.NORMAL.value)),
                     estimated_duration=data.get('estimated_duration', 30.0)
                 )
+                job_id = job.job_id
+                
+                # Same event loop as the workers: enqueue directly
+                self._enqueue_job(job)
                 
                 return jsonify({
                     "success": True,
                     "job_id": job_id,
                     "status": "submitted",
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": g.now_iso
                 })
                 
             except Exception as e:
@@ -181,33 +274,34 @@ class ProductionLambdaVisualizer:
                 return jsonify({"error": str(e)}), 400
         
         @app.route('/api/jobs/<job_id>', methods=['GET'])
-        def get_job_status(job_id):
+        async def get_job_status(job_id):
             """Ottiene lo stato di un job."""
             
             job = self.job_manager.get_job(job_id)
             if not job:
                 return jsonify({"error": "Job not found"}), 404
             
-            return jsonify({
-                "job_id": job.job_id,
-                "status": job.status.value,
-                "progress": job.progress,
-                "created_at": job.created_at.isoformat(),
-                "started_at": job.started_at.isoformat() if job.started_at else None,
-                "completed_at": job.completed_at.isoformat() if job.completed_at else None,
-                "result": job.result_data,
-                "error": job.error_message
-            })
+            return jsonify(self._job_status_payload(job))
+        
+        @app.route('/api/jobs', methods=['GET'])
+        async def get_jobs_status():
+            """Ottiene lo stato di più job (?ids=a,b,c) con una sola query."""
+            
+            job_ids = [job_id for job_id in request.args.get('ids', '').split(',') if job_id]
+            if not job_ids:
+                return jsonify({"error": "Missing ids"}), 400
+            
+            jobs = self.job_manager.get_jobs(job_ids)
+            return jsonify({"jobs": [self._job_status_payload(job) for job in jobs]})
         
         @app.route('/api/statistics', methods=['GET'])
-        def get_statistics():
+        async def get_statistics():
             """Ottiene statistiche del sistema."""
             
-            stats = self.job_manager.get_job_statistics()
             return jsonify({
-                "system_stats": stats,
+                "system_stats": system_statistics(),
                 "gpu_info": self.gpu_acceleration.device_info,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": g.now_iso
             })
         
         return app
@@ -223,12 +317,15 @@ class ProductionLambdaVisualizer:
             job_data = message.data
             
             try:
-                job_id = self.job_manager.create_job(
+                job = self.job_manager.create_job_record(
                     job_type="lambda_visualization_ws",
                     input_data=job_data,
                     priority=JobPriority.NORMAL,
                     metadata={"client_id": client_id}
                 )
+                job_id = job.job_id
+                
+                self._enqueue_job(job)
                 
                 await self.websocket_server.manager.send_to_client(
                     client_id, MessageType.JOB_UPDATE, {
@@ -247,68 +344,93 @@ class ProductionLambdaVisualizer:
         
         self.websocket_server.manager.message_handlers[MessageType.JOB_SUBMIT] = handle_job_submit
     
-    async def process_job(self, job_id: str) -> Dict[str, Any]:
-        """Processa un job completo."""
+    def _reduce_expression(self, expression: str, max_steps: int) -> Dict[str, Any]:
+        """Riduce un'espressione nel pool di processi (blocca solo il thread chiamante)."""
+        
+        return self.cpu_pool.submit(
+            reduce_worker, expression, max_steps, self.config.default_strategy,
+            self.config.fast_reduction
+        ).result()
+    
+    def _enqueue_job(self, job: JobRecord):
+        """Mette un job nella coda dei worker (da chiamare nel thread dell'event loop)."""
+        
+        self.job_queue.put_nowait((-job.priority.value, next(self._job_sequence), job))
+    
+    def _job_status_payload(self, job: JobRecord) -> Dict[str, Any]:
+        """Rappresentazione REST dello stato di un job."""
+        
+        payload = job.to_json_dict(JOB_STATUS_FIELDS)
+        payload["result"] = job.result_data
+        payload["error"] = job.error_message
+        return payload
+    
+    def _report_progress(self, job, progress: float):
+        """Aggiorna l'avanzamento di un job e lo accoda per il client WebSocket."""
+        
+        self.job_manager.update_job_status(job.job_id, JobStatus.RUNNING, progress=progress)
+        
+        if job.metadata and "client_id" in job.metadata:
+            self.progress_notifier.stage(
+                job.metadata["client_id"], job.job_id, JobStatus.RUNNING.value, progress
+            )
+    
+    async def process_job(self, job: JobRecord) -> Dict[str, Any]:
+        """Processa un job completo (il record arriva già caricato dalla coda)."""
         
-        job = self.job_manager.get_job(job_id)
-        if not job:
-            raise ValueError(f"Job {job_id} not found")
+        job_id = job.job_id
         
         try:
-            # Update status to running
-            self.job_manager.update_job_status(job_id, JobStatus.RUNNING, progress=0.0)
-            
-            # Notify WebSocket clients if applicable
-            if job.metadata and "client_id" in job.metadata:
-                await self.websocket_server.manager.send_to_client(
-                    job.metadata["client_id"], MessageType.JOB_UPDATE, {
-                        "job_id": job_id,
-                        "status": "running",
-                        "progress": 0.0
-                    }
-                )
+            # Update status to running (WebSocket clients get coalesced updates)
+            self._report_progress(job, 0.0)
             
-            # Step 1: Parse and analyze expression (20%)
+            # Step 1: Parse and reduce in the worker pool (40%)
             expression = job.input_data["expression"]
-            term = self.lambda_parser.parse(expression)
-            
-            self.job_manager.update_job_status(job_id, JobStatus.RUNNING, progress=0.2)
-            
-            # Step 2: Perform beta reduction (40%)
-            reduction_result = self.beta_reducer.reduce(term, max_steps=self.config.max_reduction_steps)
+            async with self.reduction_semaphore:
+                reduction_result = await asyncio.get_running_loop().run_in_executor(
+                    None, self._reduce_cached, expression, self.config.max_reduction_steps
+                )
             
-            self.job_manager.update_job_status(job_id, JobStatus.RUNNING, progress=0.4)
+            self._report_progress(job, 0.4)
             
-            # Step 3: Create Manim animation (70%)
+            # Step 2: Create Manim animation (70%)
             scene_config = {
                 "duration": job.input_data.get("duration", 5.0),
                 "quality": job.input_data.get("quality", self.config.video_quality),
                 "fps": job.input_data.get("fps", 30)
             }
             
-            animation_result = self.manim_integration.create_lambda_animation(
-                expression, scene_config
-            )
-            
-            self.job_manager.update_job_status(job_id, JobStatus.RUNNING, progress=0.7)
-            
-            # Step 4: Generate final video if needed (90%)
-            final_video_path = None
-            
-            if animation_result["success"] and animation_result.get("frames"):
-                video_result = self.video_output.frames_to_video(
-                    animation_result["frames"],
-                    f"lambda_viz_{job_id}",
-                    fps=scene_config["fps"],
-                    quality=scene_config["quality"]
+            # Rendering (Manim + FFmpeg) is GPU/IO-bound: bounded separately
+            async with self.render_semaphore:
+                animation_result = await asyncio.get_running_loop().run_in_executor(
+                    None, self.manim_integration.create_lambda_animation, expression, scene_config
                 )
                 
-                if video_result["success"]:
-                    final_video_path = video_result["video_path"]
+                self._report_progress(job, 0.7)
+                
+                # Step 3: Generate final video if needed (90%)
+                final_video_path = None
+                
+                if animation_result["success"] and animation_result.get("video_path"):
+                    # Manim already encoded the animation
+                    final_video_path = animation_result["video_path"]
+                elif animation_result["success"] and animation_result.get("frames"):
+                    # Render frames straight into the FFmpeg pipe, off the event loop
+                    video_result = await asyncio.get_running_loop().run_in_executor(
+                        None,
+                        self.video_output.stream_frames_to_video,
+                        iter(animation_result["frames"]),
+                        f"lambda_viz_{job_id}",
+                        scene_config["fps"],
+                        scene_config["quality"]
+                    )
+                
+                    if video_result["success"]:
+                        final_video_path = video_result["video_path"]
             
-            self.job_manager.update_job_status(job_id, JobStatus.RUNNING, progress=0.9)
+            self._report_progress(job, 0.9)
             
-            # Step 5: Compile final result (100%)
+            # Step 4: Compile final result (100%)
             result = {
                 "expression": expression,
                 "analysis": reduction_result,
@@ -321,12 +443,14 @@ class ProductionLambdaVisualizer:
                 }
             }
             
-            # Save result and mark as completed
-            self.job_manager.save_job_result(job_id, result)
-            self.job_manager.update_job_status(job_id, JobStatus.COMPLETED, progress=1.0)
+            # Save result and mark as completed in a single transaction
+            self.job_manager.update_job_status(
+                job_id, JobStatus.COMPLETED, progress=1.0, result_data=result
+            )
             
             # Notify WebSocket clients
             if job.metadata and "client_id" in job.metadata:
+                await self.progress_notifier.discard(job.metadata["client_id"], job_id)
                 await self.websocket_server.manager.send_to_client(
                     job.metadata["client_id"], MessageType.JOB_COMPLETED, {
                         "job_id": job_id,
@@ -347,6 +471,7 @@ class ProductionLambdaVisualizer:
             
             # Notify WebSocket clients
             if job.metadata and "client_id" in job.metadata:
+                await self.progress_notifier.discard(job.metadata["client_id"], job_id)
                 await self.websocket_server.manager.send_to_client(
                     job.metadata["client_id"], MessageType.JOB_FAILED, {
                         "job_id": job_id,
@@ -358,30 +483,33 @@ class ProductionLambdaVisualizer:
             logger.error(f"❌ Job {job_id} failed: {e}")
             raise
     
-    async def job_worker(self, worker_id: int):
-        """Worker per processare job dalla coda."""
+    async def job_dispatcher(self):
+        """Preleva i job dalla coda e li avvia come task, entro max_concurrent_jobs."""
         
-        logger.info(f"🔧 Worker {worker_id} started")
+        logger.info("🔧 Job dispatcher started")
         
         while not self.shutdown_event.is_set():
-            try:
-                # Get pending jobs
-                pending_jobs = self.job_manager.get_pending_jobs(limit=1)
-                
-                if pending_jobs:
-                    job = pending_jobs[0]
-                    logger.info(f"🔄 Worker {worker_id} processing job {job.job_id}")
-                    
-                    await self.process_job(job.job_id)
-                else:
-                    # No jobs, wait a bit
-                    await asyncio.sleep(1)
-                    
-            except Exception as e:
-                logger.error(f"Worker {worker_id} error: {e}")
-                await asyncio.sleep(5)  # Wait before retrying
+            # Wait for a free slot, then for the next submitted job
+            await self.job_slots.acquire()
+            _, _, job = await self.job_queue.get()
+            
+            task = asyncio.create_task(self._run_job(job))
+            self.job_tasks.add(task)
+            task.add_done_callback(self.job_tasks.discard)
         
-        logger.info(f"🔧 Worker {worker_id} stopped")
+        logger.info("🔧 Job dispatcher stopped")
+    
+    async def _run_job(self, job: JobRecord):
+        """Esegue un job e ne libera lo slot."""
+        
+        try:
+            logger.info(f"🔄 Processing job {job.job_id}")
+            await self.process_job(job)
+        except Exception as e:
+            logger.debug(f"Job {job.job_id} ended with error: {e}")  # Already marked failed
+        finally:
+            self.job_slots.release()
+            self.job_queue.task_done()
     
     async def start_system(self):
         """Avvia il sistema completo."""
@@ -389,40 +517,39 @@ class ProductionLambdaVisualizer:
         logger.info("🚀 Starting Production Lambda Visualizer System")
         
         # Create output directories
-        Path(self.config.output_directory).mkdir(exist_ok=True)
-        Path(self.config.output_directory, "manim").mkdir(exist_ok=True)
-        Path(self.config.output_directory, "videos").mkdir(exist_ok=True)
+        for directory in (self.manim_dir, self.videos_dir):
+            directory.mkdir(parents=True, exist_ok=True)
         
         # Start WebSocket server
         await self.websocket_server.start_server()
         
-        # Start job workers
-        for i in range(self.config.max_concurrent_jobs):
-            worker = asyncio.create_task(self.job_worker(i))
-            self.workers.append(worker)
-        
-        # Start Flask app in a separate thread
-        def run_flask():
-            self.flask_app.run(
-                host=self.config.api_host,
-                port=self.config.api_port,
-                debug=False,
-                threaded=True
-            )
+        # Jobs left pending by a previous run are queued once at startup
+        for job in self.job_manager.get_pending_jobs(limit=-1):  # -1: no limit
+            self._enqueue_job(job)
+        
+        # Start job dispatcher
+        self.dispatcher_task = asyncio.create_task(self.job_dispatcher())
         
-        flask_thread = threading.Thread(target=run_flask, daemon=True)
-        flask_thread.start()
+        # Serve the REST API as a task on this event loop
+        self.api_server = uvicorn.Server(uvicorn.Config(
+            self.api_app,
+            host=self.config.api_host,
+            port=self.config.api_port,
+            log_level="warning"
+        ))
+        self.api_task = asyncio.create_task(self.api_server.serve())
         
         logger.info(f"✅ System started successfully")
         logger.info(f"   - WebSocket: ws://{self.config.websocket_host}:{self.config.websocket_port}")
         logger.info(f"   - REST API: http://{self.config.api_host}:{self.config.api_port}")
-        logger.info(f"   - Workers: {self.config.max_concurrent_jobs}")
+        logger.info(f"   - Concurrent jobs: {self.config.max_concurrent_jobs} "
+                    f"(renders: {self.config.max_concurrent_renders})")
         
-        # Keep running
+        # Keep running until the API server exits: uvicorn handles SIGINT/SIGTERM
+        # itself and only sets should_exit, so no KeyboardInterrupt reaches us
         try:
-            while True:
-                await asyncio.sleep(1)
-        except KeyboardInterrupt:
+            await self.api_task
+        finally:
             logger.info("🛑 Shutdown requested")
             await self.stop_system()
     
@@ -434,16 +561,26 @@ class ProductionLambdaVisualizer:
         # Signal shutdown
         self.shutdown_event.set()
         
-        # Stop workers
-        for worker in self.workers:
-            worker.cancel()
+        # Stop dispatcher and running jobs
+        tasks = [task for task in (self.dispatcher_task, *self.job_tasks) if task is not None]
+        for task in tasks:
+            task.cancel()
         
-        # Wait for workers to finish
-        await asyncio.gather(*self.workers, return_exceptions=True)
+        # Wait for them to finish
+        await asyncio.gather(*tasks, return_exceptions=True)
         
-        # Stop WebSocket server
+        # Stop REST API
+        if self.api_server is not None:
+            self.api_server.should_exit = True
+            await asyncio.gather(self.api_task, return_exceptions=True)
+        
+        # Deliver pending progress updates, then stop WebSocket server
+        await self.progress_notifier.flush()
         await self.websocket_server.stop_server()
         
+        # Stop reduction processes
+        self.cpu_pool.shutdown(wait=False, cancel_futures=True)
+        
         logger.info("✅ System stopped successfully")
 
 # Configuration and startup
@@ -479,7 +616,10 @@ async def main():
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if UVLOOP_AVAILABLE:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         print("\n👋 Goodbye!")
     except Exception as e:
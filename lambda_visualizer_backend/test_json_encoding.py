@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test dell'encoder JSON condiviso (orjson con fallback su json).
+"""
+
+import sys
+import os
+import json
+from datetime import datetime
+from enum import Enum
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils import json_encoding
+from utils.json_encoding import json_dumps, json_dumps_bytes, json_loads
+
+class Color(Enum):
+    RED = "red"
+
+@pytest.fixture(params=[True, False], ids=["orjson", "json"])
+def encoder(request, monkeypatch):
+    """Esegue il test con orjson (se installato) e con la libreria standard."""
+
+    if request.param and not json_encoding.ORJSON_AVAILABLE:
+        pytest.skip("orjson non installato")
+    monkeypatch.setattr(json_encoding, "ORJSON_AVAILABLE", request.param)
+    return request.param
+
+def test_big_integers_fall_back_to_json(encoder):
+    """Gli interi oltre 64 bit (es. numerali di Church grandi) vengono serializzati."""
+
+    payload = {"value": 2 ** 70, "nested": [-(2 ** 80)]}
+
+    assert json.loads(json_dumps(payload)) == payload
+    assert json.loads(json_dumps_bytes(payload)) == payload
+    assert json_loads(json_dumps(payload)) == payload
+
+def test_non_native_types(encoder):
+    """datetime, Enum e array NumPy hanno la stessa forma con i due encoder."""
+
+    when = datetime(2024, 1, 2, 3, 4, 5)
+    decoded = json_loads(json_dumps({"at": when, "color": Color.RED, "data": np.arange(3)}))
+
+    assert decoded == {"at": when.isoformat(), "color": "red", "data": [0, 1, 2]}
+
+def test_unserializable_object_raises_type_error(encoder):
+    """Un oggetto non serializzabile resta un errore anche dopo il fallback."""
+
+    with pytest.raises(TypeError):
+        json_dumps({"obj": object()})
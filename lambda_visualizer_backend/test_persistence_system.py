@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Test per il sistema di persistenza (id BLOB, migrazione dello schema originale
+e aggiornamenti di stato coalescenti).
+"""
+
+import pickle
+import sqlite3
+import sys
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.persistence_system import (
+    PersistenceManager, JobManager, PerformanceTracker, SystemStateManager,
+    JobRecord, JobStatus, JobPriority,
+    SCHEMA_VERSION, pickle_out_of_band
+)
+
+# Schema creato dalla versione originale (id UUID testuali, nessun user_version)
+BASELINE_SCHEMA_SQL = '''
+CREATE TABLE jobs (
+    job_id TEXT PRIMARY KEY,
+    job_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    started_at TIMESTAMP,
+    completed_at TIMESTAMP,
+    input_data TEXT,
+    result_data TEXT,
+    error_message TEXT,
+    progress REAL DEFAULT 0.0,
+    estimated_duration REAL,
+    actual_duration REAL,
+    worker_id TEXT,
+    retry_count INTEGER DEFAULT 0,
+    max_retries INTEGER DEFAULT 3,
+    metadata TEXT
+);
+CREATE TABLE results (
+    result_id TEXT PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    result_type TEXT NOT NULL,
+    data_blob BLOB,
+    file_path TEXT,
+    created_at TIMESTAMP NOT NULL,
+    size_bytes INTEGER,
+    checksum TEXT,
+    FOREIGN KEY (job_id) REFERENCES jobs (job_id)
+);
+CREATE TABLE system_state (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    updated_at TIMESTAMP NOT NULL
+);
+CREATE TABLE performance_metrics (
+    metric_id TEXT PRIMARY KEY,
+    job_id TEXT,
+    metric_name TEXT NOT NULL,
+    metric_value REAL NOT NULL,
+    timestamp TIMESTAMP NOT NULL,
+    metadata TEXT,
+    FOREIGN KEY (job_id) REFERENCES jobs (job_id)
+);
+CREATE INDEX idx_jobs_status ON jobs (status);
+CREATE INDEX idx_jobs_priority ON jobs (priority);
+CREATE INDEX idx_jobs_created_at ON jobs (created_at);
+CREATE INDEX idx_results_job_id ON results (job_id);
+CREATE INDEX idx_metrics_job_id ON performance_metrics (job_id);
+'''
+
+def _create_baseline_db(path, job_ids):
+    """Crea un database con lo schema originale e alcuni job in attesa."""
+
+    conn = sqlite3.connect(str(path))
+    conn.executescript(BASELINE_SCHEMA_SQL)
+    now = datetime.now()
+
+    for job_id in job_ids:
+        conn.execute(
+            'INSERT INTO jobs (job_id, job_type, status, priority, created_at, input_data) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, 'beta_reduction', 'pending', JobPriority.NORMAL.value, now,
+             '{"expression": "x"}')
+        )
+        conn.execute(
+            'INSERT INTO results (result_id, job_id, result_type, data_blob, created_at, size_bytes) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (str(uuid.uuid4()), job_id, 'raw', b'data', now, 4)
+        )
+        conn.execute(
+            'INSERT INTO performance_metrics (metric_id, job_id, metric_name, metric_value, timestamp) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (str(uuid.uuid4()), job_id, 'duration', 1.5, now)
+        )
+
+    conn.commit()
+    conn.close()
+
+def test_new_database_uses_blob_ids(tmp_path):
+    """I nuovi job hanno id BLOB(16) nel database e testuali verso l'esterno."""
+
+    pm = PersistenceManager(str(tmp_path / "jobs.db"))
+    jobs = JobManager(pm)
+
+    job_id = jobs.create_job('beta_reduction', {'expression': 'x'})
+    stored = pm._get_connection().execute('SELECT job_id FROM jobs').fetchone()[0]
+
+    assert stored == uuid.UUID(job_id).bytes
+    assert jobs.get_job(job_id).job_id == job_id
+    assert jobs.get_job('not-a-uuid') is None
+
+def test_baseline_database_is_migrated(tmp_path):
+    """Un database creato con id TEXT viene migrato invece di essere marcato."""
+
+    path = tmp_path / "baseline.db"
+    job_ids = [str(uuid.uuid4()) for _ in range(3)]
+    _create_baseline_db(path, job_ids)
+
+    pm = PersistenceManager(str(path))
+    conn = pm._get_connection()
+    jobs = JobManager(pm)
+
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+    assert sorted(job.job_id for job in jobs.get_pending_jobs()) == sorted(job_ids)
+    assert conn.execute(
+        "SELECT COUNT(*) FROM results WHERE typeof(job_id) = 'blob' AND length(result_id) = 16"
+    ).fetchone()[0] == 3
+
+    metrics = PerformanceTracker(pm).get_metrics('duration')
+    assert sorted(metric['job_id'] for metric in metrics) == sorted(job_ids)
+
+    # Nessuna tabella temporanea e indici ricreati sulle nuove tabelle
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    assert not any(name.endswith('_v0') for name in names)
+    assert {'idx_jobs_status', 'idx_results_job_id', 'idx_metrics_name_timestamp'} <= names
+
+    # Le scritture funzionano sul database migrato
+    jobs.update_job_status(job_ids[0], JobStatus.COMPLETED, progress=1.0)
+    assert jobs.get_job(job_ids[0]).status == JobStatus.COMPLETED
+
+def test_baseline_database_with_invalid_ids_is_refused(tmp_path):
+    """Id non UUID: errore chiaro e database lasciato intatto."""
+
+    path = tmp_path / "broken.db"
+    _create_baseline_db(path, ['job-1'])
+
+    with pytest.raises(RuntimeError, match="BLOB ids"):
+        PersistenceManager(str(path))
+
+    conn = sqlite3.connect(str(path))
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == 0
+    assert conn.execute('SELECT job_id FROM jobs').fetchone()[0] == 'job-1'
+
+def _stored_status(pm, job_id):
+    """Stato e progresso scritti su disco, senza gli aggiornamenti in coda."""
+
+    row = pm._get_connection().execute(
+        'SELECT status, progress FROM jobs WHERE job_id = ?', (uuid.UUID(job_id).bytes,)
+    ).fetchone()
+    return row['status'], row['progress']
+
+@pytest.fixture
+def job_manager(tmp_path):
+    """JobManager con un intervallo di flush lungo: scritture solo esplicite."""
+
+    pm = PersistenceManager(str(tmp_path / "jobs.db"))
+    return JobManager(pm, status_flush_interval=60)
+
+def test_pending_updates_are_overlaid_on_reads(job_manager):
+    """Gli aggiornamenti non ancora scritti sono visibili da get_job e get_jobs."""
+
+    job_id = job_manager.create_job('beta_reduction', {'expression': 'x'})
+    job_manager.update_job_status(job_id, JobStatus.RUNNING, progress=0.5, worker_id='w1')
+
+    assert _stored_status(job_manager.pm, job_id) == ('pending', 0.0)
+
+    job = job_manager.get_job(job_id)
+    assert (job.status, job.progress, job.worker_id) == (JobStatus.RUNNING, 0.5, 'w1')
+    assert job.started_at is not None
+    assert job_manager.get_jobs([job_id])[0].progress == 0.5
+
+def test_status_queries_see_pending_updates(job_manager):
+    """Le query filtrate per stato e le statistiche vedono gli aggiornamenti in coda."""
+
+    running_id = job_manager.create_job('beta_reduction', {'expression': 'x'})
+    pending_id = job_manager.create_job('beta_reduction', {'expression': 'y'})
+    job_manager.update_job_status(running_id, JobStatus.RUNNING, progress=0.5)
+
+    assert [job.job_id for job in job_manager.get_pending_jobs()] == [pending_id]
+    assert [job.job_id for job in job_manager.get_jobs_by_status(JobStatus.RUNNING)] == [running_id]
+    assert job_manager.get_job_statistics()['status_counts'] == {'pending': 1, 'running': 1}
+
+def test_updates_are_coalesced_into_one_write(job_manager):
+    """Più aggiornamenti dello stesso job diventano una sola riga con l'ultimo stato."""
+
+    job_id = job_manager.create_job('beta_reduction', {'expression': 'x'})
+    job_manager.update_job_status(job_id, JobStatus.RUNNING, progress=0.2, worker_id='w1')
+    job_manager.update_job_status(job_id, JobStatus.RUNNING, progress=0.7)
+
+    assert len(job_manager._pending_updates) == 1
+
+    job_manager.flush_status_updates()
+
+    assert not job_manager._pending_updates
+    assert _stored_status(job_manager.pm, job_id) == ('running', 0.7)
+    assert job_manager.get_job(job_id).worker_id == 'w1'  # Kept from the first update
+
+def test_terminal_status_is_never_overwritten(job_manager):
+    """Un aggiornamento di progresso arrivato dopo il completamento viene ignorato."""
+
+    job_id = job_manager.create_job('beta_reduction', {'expression': 'x'})
+    job_manager.update_job_status(job_id, JobStatus.RUNNING, progress=0.5)
+    job_manager.update_job_status(job_id, JobStatus.COMPLETED, progress=1.0,
+                                  result_data={'final_term': 'x'})
+
+    # The terminal write flushed the queued update first
+    assert _stored_status(job_manager.pm, job_id) == ('completed', 1.0)
+
+    job_manager.update_job_status(job_id, JobStatus.RUNNING, progress=0.9)
+    assert job_manager.get_job(job_id).status == JobStatus.COMPLETED
+
+    job_manager.flush_status_updates()
+    job = job_manager.get_job(job_id)
+    assert (job.status, job.progress) == (JobStatus.COMPLETED, 1.0)
+    assert job.result_data == {'final_term': 'x'}
+    assert job.actual_duration is not None
+
+def test_result_data_requires_terminal_status(job_manager):
+    """result_data con uno stato non terminale è un errore."""
+
+    job_id = job_manager.create_job('beta_reduction', {'expression': 'x'})
+
+    with pytest.raises(ValueError):
+        job_manager.update_job_status(job_id, JobStatus.RUNNING, result_data={'x': 1})
+
+def test_persistence_flush_writes_pending_updates(job_manager):
+    """PersistenceManager.flush (chiusura) scrive gli aggiornamenti ancora in coda."""
+
+    job_id = job_manager.create_job('beta_reduction', {'expression': 'x'})
+    job_manager.update_job_status(job_id, JobStatus.RUNNING, progress=0.3)
+
+    job_manager.pm.flush()
+
+    assert _stored_status(job_manager.pm, job_id) == ('running', 0.3)
+
+def _job_record(job_type, status, created_at=None, **values):
+    """JobRecord con id nuovo e priorità normale."""
+
+    return JobRecord(
+        job_id=str(uuid.uuid4()), job_type=job_type, status=status,
+        priority=JobPriority.NORMAL, created_at=created_at or datetime.now(), **values
+    )
+
+def test_job_statistics(job_manager):
+    """Conteggi per stato, durata media per tipo e job delle ultime 24 ore."""
+
+    job_manager.create_jobs_bulk([
+        _job_record('reduction', JobStatus.COMPLETED, actual_duration=2.0),
+        _job_record('reduction', JobStatus.COMPLETED, actual_duration=4.0),
+        _job_record('reduction', JobStatus.PENDING),
+        _job_record('render', JobStatus.FAILED, actual_duration=1.0,
+                    created_at=datetime.now() - timedelta(days=2)),
+    ])
+
+    assert job_manager.get_job_statistics() == {
+        'status_counts': {'completed': 2, 'pending': 1, 'failed': 1},
+        'duration_stats': {
+            'reduction': {'avg_duration': 3.0, 'count': 2},
+            'render': {'avg_duration': 1.0, 'count': 1},
+        },
+        'recent_jobs_24h': 3,
+        'total_jobs': 4,
+    }
+
+def test_job_record_round_trip(job_manager):
+    """as_row scrive tutti i campi e to_json_dict li rilegge identici dal database."""
+
+    started = datetime.now() - timedelta(seconds=5)
+    record = _job_record(
+        'reduction', JobStatus.COMPLETED, created_at=started - timedelta(seconds=1),
+        started_at=started, completed_at=started + timedelta(seconds=2),
+        input_data={'expression': 'λx.x'}, result_data={'steps': 0, 'values': [2 ** 70]},
+        error_message='none', progress=1.0, estimated_duration=1.5, actual_duration=2.0,
+        worker_id='w1', retry_count=1, max_retries=5, metadata={'client_id': 'c1'}
+    )
+    job_manager.create_jobs_bulk([record])
+
+    stored = job_manager.get_job(record.job_id)
+
+    assert stored.to_json_dict() == record.to_json_dict()
+    assert stored.to_json_dict(['job_id', 'status', 'started_at']) == {
+        'job_id': record.job_id, 'status': 'completed', 'started_at': started.isoformat()
+    }
+
+def _stored_blob(pm, job_id):
+    """data_blob salvato da save_job_result per il job."""
+
+    row = pm._get_connection().execute(
+        'SELECT data_blob, size_bytes FROM results WHERE job_id = ?', (uuid.UUID(job_id).bytes,)
+    ).fetchone()
+    assert row['size_bytes'] == len(row['data_blob'])
+    return row['data_blob']
+
+def test_save_job_result_non_contiguous_buffer(job_manager):
+    """Una slice NumPy con passo viene salvata (copiata) invece di sollevare TypeError."""
+
+    matrix = np.arange(24, dtype=np.int32).reshape(4, 6)
+    sliced = matrix[::2, ::3]
+    assert not sliced.flags.c_contiguous
+
+    job_id = job_manager.create_job('beta_reduction', {'expression': 'x'})
+    job_manager.save_job_result(job_id, {'type': 'matrix'}, large_data=[b'header', sliced])
+
+    assert _stored_blob(job_manager.pm, job_id) == b'header' + sliced.tobytes()
+
+def test_save_job_result_out_of_band_buffers(job_manager):
+    """I buffer di pickle_out_of_band (anche Fortran) si ricaricano con pickle.loads."""
+
+    matrix = np.asfortranarray(np.arange(24, dtype=np.float64).reshape(4, 6))
+    header, buffers = pickle_out_of_band(matrix)
+
+    job_id = job_manager.create_job('beta_reduction', {'expression': 'x'})
+    job_manager.save_job_result(job_id, {'type': 'matrix'}, large_data=buffers)
+
+    restored = pickle.loads(header, buffers=[_stored_blob(job_manager.pm, job_id)])
+    np.testing.assert_array_equal(restored, matrix)
+
+def test_background_writer_flushes_updates(tmp_path):
+    """Il thread di scrittura svuota la coda dopo l'intervallo di debounce."""
+
+    pm = PersistenceManager(str(tmp_path / "jobs.db"))
+    jobs = JobManager(pm, status_flush_interval=0.01)
+    job_id = jobs.create_job('beta_reduction', {'expression': 'x'})
+    jobs.update_job_status(job_id, JobStatus.RUNNING, progress=0.4)
+
+    deadline = time.monotonic() + 5
+    while _stored_status(pm, job_id) != ('running', 0.4) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert _stored_status(pm, job_id) == ('running', 0.4)
+
+def test_record_metrics_batch(tmp_path):
+    """record_metrics scrive tutte le metriche con la stessa connessione sqlite3."""
+
+    pm = PersistenceManager(str(tmp_path / "jobs.db"))
+    job_id = JobManager(pm).create_job('beta_reduction', {'expression': 'x'})
+    tracker = PerformanceTracker(pm)
+
+    tracker.record_metrics([('duration', 1.0, job_id, {'unit': 's'}), ('duration', 2.0, None, None)])
+    tracker.record_metric('duration', 3.0)
+
+    metrics = tracker.get_metrics('duration')
+    assert sorted(metric['value'] for metric in metrics) == [1.0, 2.0, 3.0]
+    assert {metric['job_id'] for metric in metrics} == {job_id, None}
+    assert tracker.audit_query_plans() == []
+
+def test_system_state_reads_are_copies(tmp_path):
+    """Modificare il valore letto non cambia la cache: serve save_state."""
+
+    pm = PersistenceManager(str(tmp_path / "jobs.db"))
+    states = SystemStateManager(pm, flush_interval=60)
+    states.save_state('config', {'a': [1]})
+
+    states.get_state('config')['a'].append(2)
+    states.get_all_states()['config']['a'].append(3)
+
+    assert states.get_state('config') == {'a': [1]}
+
+def test_system_state_failed_flush_keeps_dirty_keys(tmp_path):
+    """Se il commit fallisce gli stati restano da scrivere e vengono salvati dopo."""
+
+    pm = PersistenceManager(str(tmp_path / "jobs.db"))
+    states = SystemStateManager(pm, flush_interval=60)
+    states.save_state('config', {'a': 1})
+
+    pm._get_connection().execute('DROP TABLE system_state')
+    with pytest.raises(sqlite3.OperationalError):
+        states.flush()
+    assert 'config' in states._state_dirty
+
+    pm._get_connection().execute(
+        'CREATE TABLE system_state (key TEXT PRIMARY KEY, value TEXT, updated_at TIMESTAMP NOT NULL)'
+    )
+    states.flush()
+
+    assert not states._state_dirty
+    assert SystemStateManager(pm).get_state('config') == {'a': 1}
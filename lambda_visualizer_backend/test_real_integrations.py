@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Test per le integrazioni reali (qualità Manim e output video).
+"""
+
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.real_integrations import RealManimIntegration, MANIM_QUALITIES
+
+@pytest.mark.parametrize("quality, expected", [
+    ("high", "high_quality"),
+    ("h", "high_quality"),
+    ("medium_quality", "medium_quality"),
+    ("low", "low_quality"),
+    ("ultra", "fourk_quality"),
+    ("unknown", "medium_quality"),
+])
+def test_manim_quality_aliases(quality, expected):
+    """Nomi brevi, flag della CLI e nomi completi diventano chiavi di QUALITIES."""
+
+    assert RealManimIntegration._manim_quality(quality) == expected
+
+def test_manim_qualities_match_manim_constants():
+    """Tutte le chiavi normalizzate esistono in manim.constants.QUALITIES."""
+
+    constants = pytest.importorskip("manim.constants")
+    assert set(MANIM_QUALITIES.values()) <= set(constants.QUALITIES)
+
+def test_default_config_quality_is_supported():
+    """La qualità della configurazione di default ("high") è valida per Manim."""
+
+    production_system = pytest.importorskip("production_system")
+    quality = production_system.SystemConfiguration().video_quality
+
+    assert quality in MANIM_QUALITIES
+    assert RealManimIntegration._manim_quality(quality) == "high_quality"
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test di reduce_fast (kernel Numba/Cython) contro il riduttore di riferimento.
+"""
+
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils import complete_beta_reduction
+from utils.complete_beta_reduction import (
+    LambdaParser, BetaReducer, ReductionStrategy, Variable, Lambda, Application
+)
+
+# Espressioni che raggiungono la forma normale (nomi a una lettera)
+NORMALIZING_EXPRESSIONS = [
+    "x",
+    "(λx.x) y",
+    "(λx.λy.x) a b",
+    "(λx.λy.x) y",                              # cattura: y va rinominata
+    "(λx.λy.y x) y",
+    "(λx.x x) (λy.y)",
+    "(λn.λf.λx.f (n f x)) (λf.λx.f x)",         # SUCC 1
+    "(λm.λn.λf.λx.m f (n f x)) (λf.λx.f (f x)) (λf.λx.f (f x))",  # PLUS 2 2
+    "(λx.λy.λz.x z (y z)) (λx.λy.x) (λx.λy.x) a",  # S K K a
+    "λz.(λx.x) z",
+    "(λx.λy.x) a ((λx.x x) (λx.x x))",          # ordine normale: Ω scartato
+]
+
+KERNELS = [pytest.param(complete_beta_reduction._flat_reduce, id="numba")]
+if complete_beta_reduction.CYTHON_REDUCER_AVAILABLE:
+    KERNELS.append(pytest.param(complete_beta_reduction._compiled_flat_reduce, id="cython"))
+
+def _de_bruijn(term, scope=()):
+    """Forma di de Bruijn di un termine: uguale per termini alfa-equivalenti."""
+
+    if isinstance(term, Variable):
+        if term.name in scope:
+            return ('var', scope[::-1].index(term.name))  # distanza dal binder più interno
+        return ('free', term.name)
+    if isinstance(term, Lambda):
+        return ('lam', _de_bruijn(term.body, scope + (term.parameter.name,)))
+    return ('app', _de_bruijn(term.function, scope), _de_bruijn(term.argument, scope))
+
+def _reference_reduce(term, max_steps=100):
+    """Termine finale e numero di passi del riduttore di riferimento."""
+
+    reducer = BetaReducer(ReductionStrategy.NORMAL_ORDER)
+    steps = 0
+    while steps < max_steps:
+        redex = reducer._find_redex(term)
+        if redex is None:
+            break
+        term = reducer._reduce_redex(term, redex)
+        steps += 1
+    return term, steps
+
+def _kernel_reduce(term, kernel, max_steps=100):
+    """Come reduce_fast, ma con il kernel indicato; restituisce il termine finale."""
+
+    reducer = BetaReducer(ReductionStrategy.NORMAL_ORDER)
+    nodes, size, root, binder_names, free_names = reducer._to_flat(term)
+    nodes, size, root, steps, is_normal_form = kernel(nodes, size, root, max_steps)
+    return reducer._from_flat(nodes, root, binder_names, free_names), int(steps), bool(is_normal_form)
+
+@pytest.mark.parametrize("kernel", KERNELS)
+@pytest.mark.parametrize("expression", NORMALIZING_EXPRESSIONS)
+def test_kernel_matches_reference(kernel, expression):
+    """Stessa forma normale (a meno di alfa-conversione) e stesso numero di passi."""
+
+    term = LambdaParser().parse(expression)
+    expected, expected_steps = _reference_reduce(term)
+    result, steps, is_normal_form = _kernel_reduce(term, kernel)
+
+    assert is_normal_form
+    assert steps == expected_steps
+    assert _de_bruijn(result) == _de_bruijn(expected)
+
+@pytest.mark.parametrize("kernel", KERNELS)
+def test_kernel_stops_at_max_steps(kernel):
+    """Un termine senza forma normale si ferma a max_steps, senza forma normale."""
+
+    term = LambdaParser().parse("(λx.x x) (λx.x x)")
+    result, steps, is_normal_form = _kernel_reduce(term, kernel, max_steps=50)
+
+    assert steps == 50
+    assert not is_normal_form
+    assert _de_bruijn(result) == _de_bruijn(term)
+
+def test_reduce_fast_result():
+    """reduce_fast restituisce lo stesso dizionario di reduce, senza passi intermedi."""
+
+    term = LambdaParser().parse("(λn.λf.λx.f (n f x)) (λf.λx.f x)")
+    reducer = BetaReducer()
+    expected = reducer.reduce(term)
+    result = reducer.reduce_fast(term)
+
+    assert result["final_term"] == expected["final_term"] == "λf.λx.(f (f x))"
+    assert result["steps"] == expected["steps"]
+    assert result["is_normal_form"] is True
+    assert result["reduction_steps"] == []
+    assert result["combinator"] == expected["combinator"]
+
+def test_reduce_fast_renames_captured_binders():
+    """Un parametro che catturerebbe una variabile libera viene rinominato."""
+
+    result = BetaReducer().reduce_fast(LambdaParser().parse("(λx.λy.x) y"))
+
+    assert result["final_term"].endswith(".y")
+    assert not result["final_term"].startswith("λy.")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test per ProgressNotifier (aggiornamenti di avanzamento coalescenti via WebSocket).
+"""
+
+import sys
+import os
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.websocket_communication import ProgressNotifier, MessageType
+
+class RecordingManager:
+    """Sostituto di WebSocketManager che registra i messaggi inviati.
+
+    Con `gate` impostato, ogni invio resta sospeso finché il gate non si apre.
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.sending = asyncio.Event()
+        self.gate = None
+
+    async def send_to_client(self, client_id, message_type, data):
+        self.sending.set()
+        if self.gate is not None:
+            await self.gate.wait()
+        self.sent.append((client_id, message_type, data))
+
+def test_updates_are_sent_as_one_batch():
+    """N aggiornamenti di più job diventano un solo JOB_UPDATE_BATCH con l'ultimo stato."""
+
+    async def scenario():
+        manager = RecordingManager()
+        notifier = ProgressNotifier(manager, interval=60)
+
+        for step in range(10):
+            notifier.stage("c1", "job-a", "running", step / 10)
+        notifier.stage("c1", "job-b", "running", 0.5)
+        await notifier.flush()
+        notifier._flush_task.cancel()
+        return manager.sent
+
+    sent = asyncio.run(scenario())
+
+    assert len(sent) == 1
+    client_id, message_type, data = sent[0]
+    assert (client_id, message_type) == ("c1", MessageType.JOB_UPDATE_BATCH)
+    assert data["jobs"] == [
+        {"job_id": "job-a", "status": "running", "progress": 0.9},
+        {"job_id": "job-b", "status": "running", "progress": 0.5},
+    ]
+
+def test_discard_waits_for_in_flight_batch():
+    """discard attende il batch in invio: il messaggio terminale arriva per ultimo."""
+
+    async def scenario():
+        manager = RecordingManager()
+        manager.gate = asyncio.Event()
+        notifier = ProgressNotifier(manager, interval=0.01)
+
+        notifier.stage("c1", "job-a", "running", 0.4)
+        await manager.sending.wait()  # Il tick di invio è sospeso nel send
+
+        notifier.stage("c1", "job-a", "running", 0.7)  # Staged durante l'invio
+        discard = asyncio.create_task(notifier.discard("c1", "job-a"))
+        await asyncio.sleep(0)
+        assert not discard.done()
+
+        manager.gate.set()
+        await discard
+        await manager.send_to_client("c1", MessageType.JOB_COMPLETED, {"job_id": "job-a"})
+
+        await asyncio.sleep(0.05)  # Altri tick del flush loop non devono inviare nulla
+        return manager.sent, notifier._pending
+
+    sent, pending = asyncio.run(scenario())
+
+    assert [message_type for _, message_type, _ in sent] == [
+        MessageType.JOB_UPDATE_BATCH, MessageType.JOB_COMPLETED
+    ]
+    assert sent[0][2]["jobs"] == [{"job_id": "job-a", "status": "running", "progress": 0.4}]
+    assert pending == {}
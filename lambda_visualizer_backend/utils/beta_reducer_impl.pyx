@@ -0,0 +1,226 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Beta Reducer Implementation (Cython)
+Versione compilata AOT dei kernel di reduce_fast (complete_beta_reduction):
+stessa arena piatta int32 (4, N) con indici di de Bruijn, nessun JIT all'avvio.
+
+Compilazione (una volta, all'installazione):
+    cythonize -i utils/beta_reducer_impl.pyx
+"""
+
+import numpy as np
+from libc.stdlib cimport malloc, realloc, free
+
+cdef enum:
+    TAG = 0
+    CHILD0 = 1
+    CHILD1 = 2
+    VAR_IDX = 3
+
+cdef enum:
+    NODE_VAR = 0
+    NODE_LAM = 1
+    NODE_APP = 2
+
+cdef struct Frame:
+    long node
+    long depth
+    int state
+    int mode
+    long shift
+
+cdef struct Stack:
+    Frame *frames
+    Py_ssize_t size
+    Py_ssize_t capacity
+
+cdef class _Arena:
+    """Arena dei nodi: cresce raddoppiando, come _flat_grow."""
+
+    cdef object array
+    cdef int[:, ::1] nodes
+    cdef Py_ssize_t size
+
+    def __init__(self, nodes, Py_ssize_t size):
+        self.array = np.ascontiguousarray(nodes, dtype=np.int32)
+        self.nodes = self.array
+        self.size = size
+
+    cdef long new(self, int tag, long child0, long child1, long var_idx) except -1:
+        cdef Py_ssize_t capacity = self.nodes.shape[1]
+        if self.size == capacity:
+            grown = np.empty((4, capacity * 2), np.int32)
+            grown[:, :capacity] = self.array
+            self.array = grown
+            self.nodes = grown
+        self.nodes[TAG, self.size] = tag
+        self.nodes[CHILD0, self.size] = child0
+        self.nodes[CHILD1, self.size] = child1
+        self.nodes[VAR_IDX, self.size] = var_idx
+        self.size += 1
+        return self.size - 1
+
+cdef int _push(Stack *stack, long node, long depth, int state, int mode, long shift) except -1:
+    cdef Frame *frames
+    if stack.size == stack.capacity:
+        frames = <Frame *> realloc(stack.frames, stack.capacity * 2 * sizeof(Frame))
+        if frames == NULL:
+            raise MemoryError()
+        stack.frames = frames
+        stack.capacity *= 2
+    stack.frames[stack.size] = Frame(node, depth, state, mode, shift)
+    stack.size += 1
+    return 0
+
+cdef int _init_stack(Stack *stack) except -1:
+    stack.frames = <Frame *> malloc(64 * sizeof(Frame))
+    if stack.frames == NULL:
+        raise MemoryError()
+    stack.size = 0
+    stack.capacity = 64
+    return 0
+
+cdef long _instantiate(_Arena arena, Stack *frames, Stack *results,
+                       long body, long argument) except -1:
+    """Sostituisce la variabile 0 di body con argument, shiftando i liberi."""
+    cdef Frame *frame
+    cdef long node, depth, shift, index, result, new_body, new_function, new_argument
+    cdef int state, mode, tag
+
+    frames.size = 0
+    results.size = 0
+    _push(frames, body, 0, 0, 0, 0)
+
+    while frames.size > 0:
+        frame = &frames.frames[frames.size - 1]
+        node = frame.node
+        depth = frame.depth
+        state = frame.state
+        mode = frame.mode
+        shift = frame.shift
+        tag = arena.nodes[TAG, node]
+
+        if tag == NODE_VAR:
+            frames.size -= 1
+            index = arena.nodes[VAR_IDX, node]
+            result = node
+            if mode == 0:
+                if index == depth and depth > 0:
+                    _push(frames, argument, 0, 0, 1, depth)
+                    continue
+                elif index == depth:
+                    result = argument
+                elif index > depth:
+                    result = arena.new(NODE_VAR, 0, 0, index - 1)
+            elif index >= depth:
+                result = arena.new(NODE_VAR, 0, 0, index + shift)
+            _push(results, result, 0, 0, 0, 0)
+        elif tag == NODE_LAM:
+            if state == 0:
+                frame.state = 1
+                _push(frames, arena.nodes[CHILD0, node], depth + 1, 0, mode, shift)
+            else:
+                frames.size -= 1
+                new_body = results.frames[results.size - 1].node
+                if new_body != arena.nodes[CHILD0, node]:
+                    results.frames[results.size - 1].node = arena.new(
+                        NODE_LAM, new_body, 0, arena.nodes[VAR_IDX, node])
+                else:
+                    results.frames[results.size - 1].node = node
+        elif state < 2:
+            frame.state = state + 1
+            _push(frames, arena.nodes[CHILD0 if state == 0 else CHILD1, node],
+                  depth, 0, mode, shift)
+        else:
+            frames.size -= 1
+            results.size -= 1
+            new_function = results.frames[results.size - 1].node
+            new_argument = results.frames[results.size].node
+            if (new_function != arena.nodes[CHILD0, node]
+                    or new_argument != arena.nodes[CHILD1, node]):
+                results.frames[results.size - 1].node = arena.new(
+                    NODE_APP, new_function, new_argument, 0)
+            else:
+                results.frames[results.size - 1].node = node
+
+    return results.frames[0].node
+
+cdef long _step(_Arena arena, Stack *stack, Stack *path, Stack *results,
+                long root) except -2:
+    """Esegue un passo leftmost-outermost; restituisce -1 se in forma normale."""
+    cdef long node, depth, redex, result, parent
+    cdef long redex_depth = -1
+    cdef int tag
+
+    stack.size = 0
+    path.size = 0
+    _push(stack, root, 0, 0, 0, 0)
+
+    while stack.size > 0:
+        stack.size -= 1
+        node = stack.frames[stack.size].node
+        depth = stack.frames[stack.size].depth
+        path.size = depth
+        _push(path, node, depth, 0, 0, 0)
+        tag = arena.nodes[TAG, node]
+
+        if tag == NODE_APP:
+            if arena.nodes[TAG, arena.nodes[CHILD0, node]] == NODE_LAM:
+                redex_depth = depth
+                break
+            # Il figlio sinistro va in cima: viene visitato per primo
+            _push(stack, arena.nodes[CHILD1, node], depth + 1, 0, 0, 0)
+            _push(stack, arena.nodes[CHILD0, node], depth + 1, 0, 0, 0)
+        elif tag == NODE_LAM:
+            _push(stack, arena.nodes[CHILD0, node], depth + 1, 0, 0, 0)
+
+    if redex_depth < 0:
+        return -1
+
+    redex = path.frames[redex_depth].node
+    result = _instantiate(arena, stack, results,
+                          arena.nodes[CHILD0, arena.nodes[CHILD0, redex]],
+                          arena.nodes[CHILD1, redex])
+
+    # Ricostruisci gli antenati del redex fino alla radice
+    for depth in range(redex_depth - 1, -1, -1):
+        parent = path.frames[depth].node
+        if arena.nodes[TAG, parent] == NODE_LAM:
+            result = arena.new(NODE_LAM, result, 0, arena.nodes[VAR_IDX, parent])
+        elif arena.nodes[CHILD0, parent] == path.frames[depth + 1].node:
+            result = arena.new(NODE_APP, result, arena.nodes[CHILD1, parent], 0)
+        else:
+            result = arena.new(NODE_APP, arena.nodes[CHILD0, parent], result, 0)
+
+    return result
+
+def flat_reduce(nodes, Py_ssize_t size, long root, long max_steps):
+    """Riduce in ordine normale fino alla forma normale o a max_steps passi.
+
+    Stessa firma e stesso risultato di _flat_reduce in complete_beta_reduction:
+    (nodes, size, root, steps, is_normal_form).
+    """
+    cdef _Arena arena = _Arena(nodes, size)
+    cdef Stack stack, path, results
+    cdef long steps = 0
+    cdef long new_root
+
+    stack.frames = path.frames = results.frames = NULL
+    try:
+        _init_stack(&stack)
+        _init_stack(&path)
+        _init_stack(&results)
+
+        while steps < max_steps:
+            new_root = _step(arena, &stack, &path, &results, root)
+            if new_root < 0:
+                return arena.array, arena.size, root, steps, True
+            root = new_root
+            steps += 1
+
+        new_root = _step(arena, &stack, &path, &results, root)
+        return arena.array, arena.size, root, steps, new_root < 0
+    finally:
+        free(stack.frames)
+        free(path.frames)
+        free(results.frames)
@@ -13,6 +13,28 @@ from dataclasses import dataclass
 from enum import Enum
 import logging
 
+import numpy as np
+
+# Numba (optional): compila il walker della riduzione su array piatti
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback: senza Numba i kernel girano come Python puro."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# Cython (optional): gli stessi kernel compilati AOT, senza tempi di JIT
+try:
+    from .beta_reducer_impl import flat_reduce as _compiled_flat_reduce
+    CYTHON_REDUCER_AVAILABLE = True
+except ImportError:
+    CYTHON_REDUCER_AVAILABLE = False
+
 # Aumenta limite ricorsione per espressioni complesse
 sys.setrecursionlimit(10000)
 
@@ -198,6 +220,182 @@ class LambdaParser:
         self.position += 1
         return token
 
+# Rappresentazione piatta (SoA) per reduce_fast: una matrice int32 (4, N)
+# con righe tag / child0 / child1 / var_idx e indici di de Bruijn.
+# VAR: var_idx = indice di de Bruijn (liberi: profondità + id del nome libero)
+# LAM: child0 = corpo, var_idx = id del nome del parametro
+# APP: child0 = funzione, child1 = argomento
+TAG, CHILD0, CHILD1, VAR_IDX = 0, 1, 2, 3
+NODE_VAR, NODE_LAM, NODE_APP = 0, 1, 2
+
+@njit(cache=True)
+def _flat_grow(array):
+    """Raddoppia il numero di colonne di un array 2D."""
+    grown = np.empty((array.shape[0], array.shape[1] * 2), array.dtype)
+    grown[:, :array.shape[1]] = array
+    return grown
+
+@njit(cache=True)
+def _flat_new(nodes, size, tag, child0, child1, var_idx):
+    """Aggiunge un nodo all'arena, ingrandendola se piena."""
+    if size == nodes.shape[1]:
+        nodes = _flat_grow(nodes)
+    nodes[TAG, size] = tag
+    nodes[CHILD0, size] = child0
+    nodes[CHILD1, size] = child1
+    nodes[VAR_IDX, size] = var_idx
+    return nodes, size + 1
+
+@njit(cache=True)
+def _flat_push(frames, sp, node, depth, state, mode, shift):
+    """Spinge un frame (nodo, profondità, stato, modo, shift) sullo stack."""
+    if sp == frames.shape[1]:
+        frames = _flat_grow(frames)
+    frames[0, sp] = node
+    frames[1, sp] = depth
+    frames[2, sp] = state
+    frames[3, sp] = mode
+    frames[4, sp] = shift
+    return frames, sp + 1
+
+@njit(cache=True)
+def _flat_instantiate(nodes, size, body, argument):
+    """Sostituisce la variabile 0 di body con argument, shiftando i liberi.
+    
+    Visita post-order iterativa: i frame in modo 1 shiftano argument della
+    profondità a cui viene inserito. I sottotermini invariati sono condivisi.
+    """
+    frames = np.empty((5, 64), np.int64)  # nodo, profondità, stato, modo, shift
+    results = np.empty((1, 64), np.int64)
+    frames, sp = _flat_push(frames, 0, body, 0, 0, 0, 0)
+    rp = 0
+    
+    while sp > 0:
+        if rp + 1 >= results.shape[1]:
+            results = _flat_grow(results)
+        
+        node = frames[0, sp - 1]
+        depth = frames[1, sp - 1]
+        state = frames[2, sp - 1]
+        mode = frames[3, sp - 1]
+        shift = frames[4, sp - 1]
+        tag = nodes[TAG, node]
+        
+        if tag == NODE_VAR:
+            sp -= 1
+            index = nodes[VAR_IDX, node]
+            result = node
+            if mode == 0:
+                if index == depth and depth > 0:
+                    frames, sp = _flat_push(frames, sp, argument, 0, 0, 1, depth)
+                    continue
+                elif index == depth:
+                    result = argument
+                elif index > depth:
+                    result = size
+                    nodes, size = _flat_new(nodes, size, NODE_VAR, 0, 0, index - 1)
+            elif index >= depth:
+                result = size
+                nodes, size = _flat_new(nodes, size, NODE_VAR, 0, 0, index + shift)
+            results[0, rp] = result
+            rp += 1
+        elif tag == NODE_LAM:
+            if state == 0:
+                frames[2, sp - 1] = 1
+                frames, sp = _flat_push(frames, sp, nodes[CHILD0, node], depth + 1,
+                                        0, mode, shift)
+            else:
+                sp -= 1
+                new_body = results[0, rp - 1]
+                if new_body != nodes[CHILD0, node]:
+                    results[0, rp - 1] = size
+                    nodes, size = _flat_new(nodes, size, NODE_LAM, new_body, 0,
+                                            nodes[VAR_IDX, node])
+                else:
+                    results[0, rp - 1] = node
+        elif state < 2:
+            frames[2, sp - 1] = state + 1
+            child = nodes[CHILD0, node] if state == 0 else nodes[CHILD1, node]
+            frames, sp = _flat_push(frames, sp, child, depth, 0, mode, shift)
+        else:
+            sp -= 1
+            rp -= 1
+            new_function = results[0, rp - 1]
+            new_argument = results[0, rp]
+            if new_function != nodes[CHILD0, node] or new_argument != nodes[CHILD1, node]:
+                results[0, rp - 1] = size
+                nodes, size = _flat_new(nodes, size, NODE_APP, new_function,
+                                        new_argument, 0)
+            else:
+                results[0, rp - 1] = node
+    
+    return nodes, size, results[0, 0]
+
+@njit(cache=True)
+def _flat_step(nodes, size, root):
+    """Esegue un passo leftmost-outermost; restituisce -1 se in forma normale."""
+    stack = np.empty((5, 64), np.int64)  # righe 0-1: nodo, profondità nel cammino
+    path = np.empty((1, 64), np.int64)   # antenati del nodo corrente
+    stack, sp = _flat_push(stack, 0, root, 0, 0, 0, 0)
+    redex_depth = -1
+    
+    while sp > 0:
+        sp -= 1
+        node = stack[0, sp]
+        depth = stack[1, sp]
+        if depth >= path.shape[1]:
+            path = _flat_grow(path)
+        path[0, depth] = node
+        tag = nodes[TAG, node]
+        
+        if tag == NODE_APP:
+            if nodes[TAG, nodes[CHILD0, node]] == NODE_LAM:
+                redex_depth = depth
+                break
+            # Il figlio sinistro va in cima: viene visitato per primo
+            stack, sp = _flat_push(stack, sp, nodes[CHILD1, node], depth + 1, 0, 0, 0)
+            stack, sp = _flat_push(stack, sp, nodes[CHILD0, node], depth + 1, 0, 0, 0)
+        elif tag == NODE_LAM:
+            stack, sp = _flat_push(stack, sp, nodes[CHILD0, node], depth + 1, 0, 0, 0)
+    
+    if redex_depth < 0:
+        return nodes, size, -1
+    
+    redex = path[0, redex_depth]
+    nodes, size, result = _flat_instantiate(
+        nodes, size, nodes[CHILD0, nodes[CHILD0, redex]], nodes[CHILD1, redex]
+    )
+    
+    # Ricostruisci gli antenati del redex fino alla radice
+    for depth in range(redex_depth - 1, -1, -1):
+        parent = path[0, depth]
+        new_node = size
+        if nodes[TAG, parent] == NODE_LAM:
+            nodes, size = _flat_new(nodes, size, NODE_LAM, result, 0,
+                                    nodes[VAR_IDX, parent])
+        elif nodes[CHILD0, parent] == path[0, depth + 1]:
+            nodes, size = _flat_new(nodes, size, NODE_APP, result,
+                                    nodes[CHILD1, parent], 0)
+        else:
+            nodes, size = _flat_new(nodes, size, NODE_APP, nodes[CHILD0, parent],
+                                    result, 0)
+        result = new_node
+    
+    return nodes, size, result
+
+@njit(cache=True)
+def _flat_reduce(nodes, size, root, max_steps):
+    """Riduce in ordine normale fino alla forma normale o a max_steps passi."""
+    steps = 0
+    while steps < max_steps:
+        nodes, size, new_root = _flat_step(nodes, size, root)
+        if new_root < 0:
+            return nodes, size, root, steps, True
+        root = new_root
+        steps += 1
+    nodes, size, new_root = _flat_step(nodes, size, root)
+    return nodes, size, root, steps, new_root < 0
+
 class BetaReducer:
     """Riduttore beta completo e corretto."""
     
@@ -267,6 +465,94 @@ class BetaReducer:
             "combinator": self._identify_combinator(current_term)
         }
     
+    def reduce_fast(self, term: Term, max_steps: int = 100) -> Dict[str, Any]:
+        """Riduzione in ordine normale sulla rappresentazione piatta.
+        
+        Non registra i passi intermedi: restituisce solo il risultato finale.
+        Le strategie diverse dall'ordine normale usano reduce().
+        """
+        if self.strategy == ReductionStrategy.APPLICATIVE_ORDER:
+            return self.reduce(term, max_steps)
+        
+        nodes, size, root, binder_names, free_names = self._to_flat(term)
+        flat_reduce = _compiled_flat_reduce if CYTHON_REDUCER_AVAILABLE else _flat_reduce
+        nodes, size, root, steps, is_normal_form = flat_reduce(nodes, size, root, max_steps)
+        final_term = self._from_flat(nodes, root, binder_names, free_names)
+        
+        return {
+            "original_term": str(term),
+            "final_term": str(final_term),
+            "is_normal_form": bool(is_normal_form),
+            "steps": int(steps),
+            "reduction_steps": [],
+            "strategy": self.strategy.value,
+            "combinator": self._identify_combinator(final_term)
+        }
+    
+    def _to_flat(self, term: Term) -> Tuple[np.ndarray, int, int, List[str], List[str]]:
+        """Converte un termine nell'arena piatta con indici di de Bruijn."""
+        nodes = np.empty((4, 256), np.int32)
+        size = 0
+        binder_names: List[str] = []
+        free_names: Dict[str, int] = {}
+        scope: List[str] = []
+        
+        def build(current: Term) -> int:
+            nonlocal nodes, size
+            if isinstance(current, Variable):
+                for depth in range(len(scope) - 1, -1, -1):
+                    if scope[depth] == current.name:
+                        row = (NODE_VAR, 0, 0, len(scope) - 1 - depth)
+                        break
+                else:
+                    free_id = free_names.setdefault(current.name, len(free_names))
+                    row = (NODE_VAR, 0, 0, len(scope) + free_id)
+            elif isinstance(current, Lambda):
+                scope.append(current.parameter.name)
+                body = build(current.body)
+                scope.pop()
+                binder_names.append(current.parameter.name)
+                row = (NODE_LAM, body, 0, len(binder_names) - 1)
+            else:
+                function = build(current.function)
+                argument = build(current.argument)
+                row = (NODE_APP, function, argument, 0)
+            
+            if size == nodes.shape[1]:
+                nodes = _flat_grow(nodes)
+            nodes[:, size] = row
+            size += 1
+            return size - 1
+        
+        root = build(term)
+        return nodes, size, root, binder_names, list(free_names)
+    
+    def _from_flat(self, nodes: np.ndarray, root: int,
+                   binder_names: List[str], free_names: List[str]) -> Term:
+        """Ricostruisce un termine dall'arena, rinominando i parametri in conflitto."""
+        reserved = set(free_names)
+        scope: List[str] = []
+        
+        def build(node: int) -> Term:
+            tag = nodes[TAG, node]
+            if tag == NODE_VAR:
+                index = int(nodes[VAR_IDX, node])
+                if index < len(scope):
+                    return Variable(scope[len(scope) - 1 - index])
+                return Variable(free_names[index - len(scope)])
+            if tag == NODE_LAM:
+                name = binder_names[nodes[VAR_IDX, node]]
+                while name in reserved or name in scope:
+                    name = self._generate_fresh_variable()
+                scope.append(name)
+                body = build(int(nodes[CHILD0, node]))
+                scope.pop()
+                return Lambda(Variable(name), body)
+            return Application(build(int(nodes[CHILD0, node])),
+                               build(int(nodes[CHILD1, node])))
+        
+        return build(int(root))
+    
     def _find_redex(self, term: Term) -> Optional[Dict[str, Any]]:
         """Trova il prossimo redex da ridurre."""
         if self.strategy == ReductionStrategy.NORMAL_ORDER:
@@ -439,6 +725,15 @@ class BetaReducer:
         """Verifica equivalenza sintattica semplice."""
         return term1 == term2
 
+def warm_up_fast_reducer():
+    """Compila i kernel di reduce_fast con un termine minimo (una volta per processo).
+    
+    Con l'estensione Cython compilata non c'è nulla da compilare.
+    """
+    if CYTHON_REDUCER_AVAILABLE:
+        return
+    BetaReducer().reduce_fast(LambdaParser().parse("(λx.x) y"), max_steps=1)
+
 
 # Test and demonstration
 def test_beta_reduction():
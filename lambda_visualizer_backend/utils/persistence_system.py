@@ -6,18 +6,34 @@ Risolve la criticità 3.2: Persistenza dei Dati e dei Job.
 """
 
 import sqlite3
-import json
+import sys
 import uuid
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Union, Sequence
 from pathlib import Path
 import pickle
+import copy
 import threading
+import atexit
 import logging
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field, fields
 from enum import Enum
 
+# Eseguito come script (python utils/...): utils si importa dalla directory del backend
+if not __package__:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.json_encoding import json_dumps, json_loads
+
+# NumPy (optional): columnar access to performance metrics
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -37,9 +53,9 @@ class JobPriority(Enum):
     HIGH = 3
     URGENT = 4
 
-@dataclass
+@dataclass(slots=True)
 class JobRecord:
-    """Record di un job nel database."""
+    """Record di un job nel database (con __slots__: niente __dict__ per istanza)."""
     job_id: str
     job_type: str
     status: JobStatus
@@ -57,6 +73,226 @@ class JobRecord:
     retry_count: int = 0
     max_retries: int = 3
     metadata: Dict[str, Any] = None
+    
+    # Cache dei payload JSON già codificati (input, result, metadata)
+    _encoded: Optional[Tuple[Optional[str], ...]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    
+    def as_row(self) -> Tuple[Any, ...]:
+        """Restituisce la tupla dei parametri per JOB_INSERT_SQL."""
+        
+        if self._encoded is None:
+            self._encoded = (
+                _encode_json(self.input_data),
+                _encode_json(self.result_data),
+                _encode_json(self.metadata)
+            )
+        
+        input_json, result_json, metadata_json = self._encoded
+        
+        return (
+            _uuid_bytes(self.job_id),
+            self.job_type,
+            self.status.value,
+            self.priority.value,
+            self.created_at,
+            self.started_at,
+            self.completed_at,
+            input_json,
+            result_json,
+            self.error_message,
+            self.progress,
+            self.estimated_duration,
+            self.actual_duration,
+            self.worker_id,
+            self.retry_count,
+            self.max_retries,
+            metadata_json
+        )
+    
+    def to_json_dict(self, names: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Dizionario JSON dei campi richiesti (tutti i campi pubblici di default)."""
+        
+        data = {}
+        for name in names or JOB_FIELDS:
+            value = getattr(self, name)
+            if isinstance(value, Enum):
+                value = value.value
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            data[name] = value
+        return data
+
+# Campi pubblici di JobRecord, nell'ordine di dichiarazione
+JOB_FIELDS = tuple(f.name for f in fields(JobRecord) if not f.name.startswith('_'))
+
+JOB_INSERT_SQL = '''
+    INSERT INTO jobs (
+        job_id, job_type, status, priority, created_at, started_at, 
+        completed_at, input_data, result_data, error_message, progress,
+        estimated_duration, actual_duration, worker_id, retry_count,
+        max_retries, metadata
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+METRIC_INSERT_SQL = '''
+    INSERT INTO performance_metrics 
+    (metric_id, job_id, metric_name, metric_value, timestamp, metadata)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+METRICS_SELECT_SQL = '''
+    SELECT * FROM performance_metrics 
+    WHERE metric_name = ? AND timestamp > ?
+    ORDER BY timestamp DESC
+'''
+
+TERMINAL_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+# Aggiornamento coalescente: non sovrascrive mai uno stato terminale
+COALESCED_STATUS_UPDATE_SQL = '''
+    UPDATE jobs SET
+        status = ?,
+        progress = COALESCE(?, progress),
+        error_message = COALESCE(?, error_message),
+        worker_id = COALESCE(?, worker_id),
+        started_at = COALESCE(started_at, ?)
+    WHERE job_id = ? AND status NOT IN ('completed', 'failed', 'cancelled')
+'''
+
+# Transizione terminale: testo fisso, così sqlite3 riusa lo statement compilato
+TERMINAL_STATUS_UPDATE_SQL = '''
+    UPDATE jobs SET
+        status = ?,
+        progress = COALESCE(?, progress),
+        error_message = COALESCE(?, error_message),
+        worker_id = COALESCE(?, worker_id),
+        result_data = COALESCE(?, result_data),
+        completed_at = ?,
+        actual_duration = COALESCE(
+            (julianday(?) - julianday(started_at)) * 86400.0, actual_duration
+        )
+    WHERE job_id = ?
+'''
+
+def _new_uuid() -> bytes:
+    """Genera un nuovo identificativo come BLOB(16)."""
+    return uuid.uuid4().bytes
+
+def _uuid_bytes(value: Union[str, bytes, None]) -> Optional[bytes]:
+    """Converte un UUID testuale (formato API) nella forma BLOB(16) del database."""
+    if value is None or isinstance(value, bytes):
+        return value
+    return uuid.UUID(value).bytes
+
+def to_hex(value: Optional[bytes]) -> Optional[str]:
+    """Converte un UUID BLOB(16) nella forma testuale esposta all'esterno."""
+    return str(uuid.UUID(bytes=value)) if value is not None else None
+
+def _encode_json(value: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Codifica un payload JSON, None per payload vuoti."""
+    return json_dumps(value) if value else None
+
+# Payload binari accettati da save_job_result: bytes, memoryview o PickleBuffer
+# (PEP 574), singoli o come sequenza di buffer fuori banda
+BinaryChunk = Union[bytes, bytearray, memoryview, pickle.PickleBuffer]
+LargeData = Union[BinaryChunk, Sequence[BinaryChunk]]
+
+def pickle_out_of_band(obj: Any) -> Tuple[bytes, List[pickle.PickleBuffer]]:
+    """Serializza un oggetto con protocollo 5 tenendo i buffer fuori banda.
+    
+    Il worker invia separatamente l'header e la lista di buffer: questi ultimi
+    possono essere passati direttamente a save_job_result senza copie.
+    """
+    buffers = []
+    header = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    return header, buffers
+
+def _as_memoryview(chunk: BinaryChunk) -> memoryview:
+    """memoryview piatta di un buffer: zero-copy se contiguo, altrimenti una copia."""
+    if isinstance(chunk, pickle.PickleBuffer):
+        # Sempre contiguo (C o Fortran): raw() conserva l'ordine in memoria
+        return chunk.raw()
+    view = memoryview(chunk)
+    if not view.c_contiguous:
+        # Es. slice NumPy con passo: cast() richiede memoria contigua
+        view = memoryview(view.tobytes())
+    return view.cast('B')
+
+def _as_memoryviews(large_data: Optional[LargeData]) -> List[memoryview]:
+    """Normalizza large_data in una lista di memoryview piatte (zero-copy se possibile)."""
+    if large_data is None:
+        return []
+    
+    chunks = large_data if isinstance(large_data, (list, tuple)) else [large_data]
+    
+    return [_as_memoryview(chunk) for chunk in chunks]
+
+# Versione dello schema (PRAGMA user_version): incrementarla quando SCHEMA_SQL cambia
+SCHEMA_VERSION = 1
+
+SCHEMA_SQL = '''
+-- Jobs table
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id BLOB NOT NULL PRIMARY KEY,
+    job_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    started_at TIMESTAMP,
+    completed_at TIMESTAMP,
+    input_data TEXT,  -- JSON
+    result_data TEXT, -- JSON
+    error_message TEXT,
+    progress REAL DEFAULT 0.0,
+    estimated_duration REAL,
+    actual_duration REAL,
+    worker_id TEXT,
+    retry_count INTEGER DEFAULT 0,
+    max_retries INTEGER DEFAULT 3,
+    metadata TEXT     -- JSON
+);
+
+-- Results table (for large results)
+CREATE TABLE IF NOT EXISTS results (
+    result_id BLOB NOT NULL PRIMARY KEY,
+    job_id BLOB NOT NULL,
+    result_type TEXT NOT NULL,
+    data_blob BLOB,
+    file_path TEXT,
+    created_at TIMESTAMP NOT NULL,
+    size_bytes INTEGER,
+    checksum TEXT,
+    FOREIGN KEY (job_id) REFERENCES jobs (job_id)
+);
+
+-- System state table
+CREATE TABLE IF NOT EXISTS system_state (
+    key TEXT PRIMARY KEY,
+    value TEXT,  -- JSON
+    updated_at TIMESTAMP NOT NULL
+);
+
+-- Performance metrics table
+CREATE TABLE IF NOT EXISTS performance_metrics (
+    metric_id BLOB NOT NULL PRIMARY KEY,
+    job_id BLOB,
+    metric_name TEXT NOT NULL,
+    metric_value REAL NOT NULL,
+    timestamp TIMESTAMP NOT NULL,
+    metadata TEXT,  -- JSON
+    FOREIGN KEY (job_id) REFERENCES jobs (job_id)
+);
+
+-- Indexes
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS idx_jobs_priority ON jobs (priority);
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at);
+CREATE INDEX IF NOT EXISTS idx_results_job_id ON results (job_id);
+CREATE INDEX IF NOT EXISTS idx_metrics_job_id ON performance_metrics (job_id);
+CREATE INDEX IF NOT EXISTS idx_metrics_name_timestamp ON performance_metrics (metric_name, timestamp);
+'''
 
 class PersistenceManager:
     """Gestore principale della persistenza."""
@@ -64,103 +300,170 @@ class PersistenceManager:
     def __init__(self, db_path: str = "./lambda_visualizer.db"):
         self.db_path = Path(db_path)
         self.connection_pool = {}
-        self.lock = threading.RLock()
+        self._writer_lock = threading.Lock()  # Serializza solo le scritture
+        self._flush_hooks = []
         self._initialize_database()
+    
+    def register_flush_hook(self, hook):
+        """Registra una callback che scrive su disco dati mantenuti in memoria."""
+        self._flush_hooks.append(hook)
+    
+    def flush(self):
+        """Scrive su disco tutte le scritture differite dei manager registrati."""
+        for hook in self._flush_hooks:
+            hook()
         
     def _get_connection(self) -> sqlite3.Connection:
         """Ottiene una connessione thread-safe al database."""
         thread_id = threading.get_ident()
         
         if thread_id not in self.connection_pool:
-            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn = sqlite3.connect(
+                str(self.db_path), check_same_thread=False,
+                cached_statements=256  # Statement compilati riusati tra le chiamate
+            )
             conn.row_factory = sqlite3.Row  # Enable dict-like access
+            conn.execute('PRAGMA synchronous=NORMAL')  # Safe with WAL, no fsync per commit
             self.connection_pool[thread_id] = conn
         
         return self.connection_pool[thread_id]
     
+    def audit_query_plan(self, sql: str, params: Tuple = ()) -> List[str]:
+        """Segnala full scan, sort temporanei e indici automatici di una query."""
+        
+        conn = self._get_connection()
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        
+        issues = [
+            row['detail'] for row in plan
+            if (row['detail'].startswith('SCAN ') and ' USING ' not in row['detail'])
+            or 'TEMP B-TREE' in row['detail']
+            or 'AUTOMATIC' in row['detail']
+        ]
+        
+        for detail in issues:
+            logger.warning(f"⚠️  Query plan regression: {detail} in: {' '.join(sql.split())}")
+        
+        return issues
+    
     def _initialize_database(self):
-        """Inizializza il database con le tabelle necessarie."""
+        """Inizializza il database con le tabelle necessarie.
         
-        with self.lock:
+        Tutto il DDL viene eseguito in un'unica transazione; se user_version
+        corrisponde già a SCHEMA_VERSION l'inizializzazione viene saltata.
+        """
+        
+        with self._writer_lock:
             conn = self._get_connection()
-            cursor = conn.cursor()
             
-            # Jobs table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS jobs (
-                    job_id TEXT PRIMARY KEY,
-                    job_type TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    priority INTEGER NOT NULL,
-                    created_at TIMESTAMP NOT NULL,
-                    started_at TIMESTAMP,
-                    completed_at TIMESTAMP,
-                    input_data TEXT,  -- JSON
-                    result_data TEXT, -- JSON
-                    error_message TEXT,
-                    progress REAL DEFAULT 0.0,
-                    estimated_duration REAL,
-                    actual_duration REAL,
-                    worker_id TEXT,
-                    retry_count INTEGER DEFAULT 0,
-                    max_retries INTEGER DEFAULT 3,
-                    metadata TEXT     -- JSON
-                )
-            ''')
+            # WAL is persistent in the file: readers never block the writer
+            conn.execute('PRAGMA journal_mode=WAL')
             
-            # Results table (for large results)
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS results (
-                    result_id TEXT PRIMARY KEY,
-                    job_id TEXT NOT NULL,
-                    result_type TEXT NOT NULL,
-                    data_blob BLOB,
-                    file_path TEXT,
-                    created_at TIMESTAMP NOT NULL,
-                    size_bytes INTEGER,
-                    checksum TEXT,
-                    FOREIGN KEY (job_id) REFERENCES jobs (job_id)
-                )
-            ''')
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version == SCHEMA_VERSION:
+                return
             
-            # System state table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS system_state (
-                    key TEXT PRIMARY KEY,
-                    value TEXT,  -- JSON
-                    updated_at TIMESTAMP NOT NULL
+            if version > SCHEMA_VERSION:
+                raise RuntimeError(
+                    f"Database {self.db_path} has schema version {version}, "
+                    f"newer than the supported {SCHEMA_VERSION}"
                 )
-            ''')
             
-            # Performance metrics table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS performance_metrics (
-                    metric_id TEXT PRIMARY KEY,
-                    job_id TEXT,
-                    metric_name TEXT NOT NULL,
-                    metric_value REAL NOT NULL,
-                    timestamp TIMESTAMP NOT NULL,
-                    metadata TEXT,  -- JSON
-                    FOREIGN KEY (job_id) REFERENCES jobs (job_id)
-                )
-            ''')
+            if self._has_text_ids(conn):
+                self._migrate_text_ids(conn)
+                logger.info("✅ Database migrated to BLOB ids")
+                return
             
-            # Create indexes for better performance
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_priority ON jobs (priority)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_results_job_id ON results (job_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_metrics_job_id ON performance_metrics (job_id)')
+            conn.executescript(f'''
+                BEGIN IMMEDIATE;
+                {SCHEMA_SQL}
+                PRAGMA user_version = {SCHEMA_VERSION};
+                COMMIT;
+            ''')
             
-            conn.commit()
             logger.info("✅ Database initialized successfully")
+    
+    @staticmethod
+    def _has_text_ids(conn: sqlite3.Connection) -> bool:
+        """True se il database usa lo schema originale con id UUID testuali."""
+        
+        columns = conn.execute("PRAGMA table_info('jobs')").fetchall()
+        return any(
+            column['name'] == 'job_id' and column['type'].upper() == 'TEXT'
+            for column in columns
+        )
+    
+    def _migrate_text_ids(self, conn: sqlite3.Connection):
+        """Migra lo schema originale (id TEXT) a SCHEMA_SQL (id BLOB(16)).
+        
+        Le tabelle vecchie vengono rinominate, i dati copiati convertendo gli
+        id con uuid.UUID(text).bytes e le tabelle vecchie eliminate, tutto in
+        un'unica transazione: in caso di errore il database resta invariato.
+        """
+        
+        conn.create_function('uuid_blob', 1, _uuid_bytes, deterministic=True)
+        
+        try:
+            conn.executescript(f'''
+                BEGIN IMMEDIATE;
+                ALTER TABLE jobs RENAME TO jobs_v0;
+                ALTER TABLE results RENAME TO results_v0;
+                ALTER TABLE performance_metrics RENAME TO performance_metrics_v0;
+                DROP INDEX IF EXISTS idx_jobs_status;
+                DROP INDEX IF EXISTS idx_jobs_priority;
+                DROP INDEX IF EXISTS idx_jobs_created_at;
+                DROP INDEX IF EXISTS idx_results_job_id;
+                DROP INDEX IF EXISTS idx_metrics_job_id;
+                {SCHEMA_SQL}
+                INSERT INTO jobs SELECT
+                    uuid_blob(job_id), job_type, status, priority, created_at,
+                    started_at, completed_at, input_data, result_data,
+                    error_message, progress, estimated_duration, actual_duration,
+                    worker_id, retry_count, max_retries, metadata
+                FROM jobs_v0;
+                INSERT INTO results SELECT
+                    uuid_blob(result_id), uuid_blob(job_id), result_type,
+                    data_blob, file_path, created_at, size_bytes, checksum
+                FROM results_v0;
+                INSERT INTO performance_metrics SELECT
+                    uuid_blob(metric_id), uuid_blob(job_id), metric_name,
+                    metric_value, timestamp, metadata
+                FROM performance_metrics_v0;
+                DROP TABLE results_v0;
+                DROP TABLE performance_metrics_v0;
+                DROP TABLE jobs_v0;
+                PRAGMA user_version = {SCHEMA_VERSION};
+                COMMIT;
+            ''')
+        except sqlite3.Error as e:
+            conn.rollback()
+            raise RuntimeError(
+                f"Cannot migrate {self.db_path} to BLOB ids ({e}); the database "
+                "must be recreated or its non-UUID ids fixed"
+            ) from e
 
 class JobManager:
-    """Gestore dei job con persistenza."""
+    """Gestore dei job con persistenza.
     
-    def __init__(self, persistence_manager: PersistenceManager):
+    Gli aggiornamenti di stato non terminali (tipicamente il progresso) sono
+    accumulati per job_id e scritti da un thread in background con un solo
+    commit per finestra di debounce; le transizioni terminali sono sincrone.
+    """
+    
+    def __init__(self, persistence_manager: PersistenceManager,
+                 status_flush_interval: float = 0.2):
         self.pm = persistence_manager
         self.active_jobs = {}  # In-memory cache for active jobs
+        self.status_flush_interval = status_flush_interval
+        
+        self._pending_updates: Dict[str, Dict[str, Any]] = {}  # job_id -> update intent
+        self._pending_lock = threading.Lock()
+        self._status_flush_lock = threading.Lock()
+        self._status_flush_event = threading.Event()
+        self._status_writer_thread = None
+        
+        self.pm.register_flush_hook(self.flush_status_updates)
+        atexit.register(self.flush_status_updates)
         
     def create_job(self, job_type: str, input_data: Dict[str, Any], 
                    priority: JobPriority = JobPriority.NORMAL,
@@ -168,6 +471,16 @@ class JobManager:
                    metadata: Optional[Dict[str, Any]] = None) -> str:
         """Crea un nuovo job e lo salva nel database."""
         
+        return self.create_job_record(
+            job_type, input_data, priority, estimated_duration, metadata
+        ).job_id
+    
+    def create_job_record(self, job_type: str, input_data: Dict[str, Any],
+                          priority: JobPriority = JobPriority.NORMAL,
+                          estimated_duration: Optional[float] = None,
+                          metadata: Optional[Dict[str, Any]] = None) -> JobRecord:
+        """Come create_job, ma restituisce il JobRecord appena salvato."""
+        
         job_id = str(uuid.uuid4())
         
         job_record = JobRecord(
@@ -184,104 +497,231 @@ class JobManager:
         self._save_job(job_record)
         logger.info(f"✅ Job created: {job_id} ({job_type})")
         
-        return job_id
+        return job_record
     
     def get_job(self, job_id: str) -> Optional[JobRecord]:
         """Recupera un job dal database."""
         
-        with self.pm.lock:
-            conn = self.pm._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,))
-            row = cursor.fetchone()
-            
-            if row:
-                return self._row_to_job_record(row)
-            
+        try:
+            job_key = _uuid_bytes(job_id)
+        except ValueError:
+            return None  # Not a valid job identifier
+        
+        conn = self.pm._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT * FROM jobs WHERE job_id = ?', (job_key,))
+        row = cursor.fetchone()
+        
+        if not row:
             return None
+        
+        return self._apply_pending_update(self._row_to_job_record(row))
+    
+    def get_jobs(self, job_ids: Sequence[str]) -> List[JobRecord]:
+        """Recupera più job con una sola query (ignora gli id inesistenti o non validi)."""
+        
+        job_keys = []
+        for job_id in job_ids:
+            try:
+                job_keys.append(_uuid_bytes(job_id))
+            except ValueError:
+                continue  # Not a valid job identifier
+        
+        if not job_keys:
+            return []
+        
+        conn = self.pm._get_connection()
+        cursor = conn.cursor()
+        
+        placeholders = ', '.join('?' * len(job_keys))
+        cursor.execute(f'SELECT * FROM jobs WHERE job_id IN ({placeholders})', job_keys)
+        
+        return [self._apply_pending_update(self._row_to_job_record(row))
+                for row in cursor.fetchall()]
+    
+    def _apply_pending_update(self, job: JobRecord) -> JobRecord:
+        """Sovrappone gli aggiornamenti di stato non ancora scritti dal writer."""
+        
+        with self._pending_lock:
+            intent = self._pending_updates.get(job.job_id)
+            if intent and job.status not in TERMINAL_STATUSES:
+                job.status = intent['status']
+                job.progress = intent['progress'] if intent['progress'] is not None else job.progress
+                job.error_message = intent['error_message'] or job.error_message
+                job.worker_id = intent['worker_id'] or job.worker_id
+                job.started_at = job.started_at or intent['started_at']
+        
+        return job
     
     def update_job_status(self, job_id: str, status: JobStatus, 
                          progress: Optional[float] = None,
                          error_message: Optional[str] = None,
-                         worker_id: Optional[str] = None):
-        """Aggiorna lo stato di un job."""
+                         worker_id: Optional[str] = None,
+                         result_data: Optional[Dict[str, Any]] = None):
+        """Aggiorna lo stato di un job.
+        
+        Gli stati non terminali vengono coalescenti e scritti in background;
+        gli stati terminali vengono scritti subito, dopo gli aggiornamenti
+        ancora in coda. Con result_data il risultato viene salvato nella
+        stessa transazione della transizione terminale.
+        """
+        
+        if status not in TERMINAL_STATUSES:
+            if result_data is not None:
+                raise ValueError("result_data requires a terminal status")
+            self._enqueue_status_update(job_id, status, progress, error_message, worker_id)
+            return
+        
+        self.flush_status_updates()
         
-        with self.pm.lock:
+        completed_at = datetime.now()
+        params = (
+            status.value,
+            progress,
+            error_message,
+            worker_id,
+            json_dumps(result_data) if result_data is not None else None,
+            completed_at,
+            completed_at.isoformat(' '),
+            _uuid_bytes(job_id)
+        )
+        
+        with self.pm._writer_lock:
             conn = self.pm._get_connection()
-            cursor = conn.cursor()
-            
-            update_fields = ['status = ?']
-            params = [status.value]
+            conn.execute(TERMINAL_STATUS_UPDATE_SQL, params)
+            conn.commit()
             
-            if progress is not None:
-                update_fields.append('progress = ?')
-                params.append(progress)
+            logger.info(f"📊 Job {job_id} status updated to {status.value}")
+    
+    def flush_status_updates(self):
+        """Scrive gli aggiornamenti di stato in coda con un solo commit."""
+        
+        with self._status_flush_lock:
+            with self._pending_lock:
+                if not self._pending_updates:
+                    return
+                pending, self._pending_updates = self._pending_updates, {}
             
-            if error_message is not None:
-                update_fields.append('error_message = ?')
-                params.append(error_message)
+            rows = [
+                (
+                    intent['status'].value,
+                    intent['progress'],
+                    intent['error_message'],
+                    intent['worker_id'],
+                    intent['started_at'],
+                    _uuid_bytes(job_id)
+                )
+                for job_id, intent in pending.items()
+            ]
             
-            if worker_id is not None:
-                update_fields.append('worker_id = ?')
-                params.append(worker_id)
+            with self.pm._writer_lock:
+                conn = self.pm._get_connection()
+                conn.executemany(COALESCED_STATUS_UPDATE_SQL, rows)
+                conn.commit()
             
-            # Update timestamps based on status
-            if status == JobStatus.RUNNING and not self._job_has_started(job_id):
-                update_fields.append('started_at = ?')
-                params.append(datetime.now())
+            logger.debug(f"📊 Flushed {len(rows)} coalesced job status updates")
+    
+    def _enqueue_status_update(self, job_id: str, status: JobStatus,
+                               progress: Optional[float],
+                               error_message: Optional[str],
+                               worker_id: Optional[str]):
+        """Accoda un aggiornamento non terminale, fondendolo con quello pendente."""
+        
+        with self._pending_lock:
+            intent = self._pending_updates.get(job_id)
             
-            if status in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED]:
-                update_fields.append('completed_at = ?')
-                params.append(datetime.now())
-                
-                # Calculate actual duration
-                job = self.get_job(job_id)
-                if job and job.started_at:
-                    duration = (datetime.now() - job.started_at).total_seconds()
-                    update_fields.append('actual_duration = ?')
-                    params.append(duration)
+            if intent is None:
+                intent = self._pending_updates[job_id] = {
+                    'progress': None, 'error_message': None,
+                    'worker_id': None, 'started_at': None
+                }
             
-            params.append(job_id)
+            # Last write wins; optional fields keep their latest non-None value
+            intent['status'] = status
+            if progress is not None:
+                intent['progress'] = progress
+            if error_message is not None:
+                intent['error_message'] = error_message
+            if worker_id is not None:
+                intent['worker_id'] = worker_id
+            if status == JobStatus.RUNNING and intent['started_at'] is None:
+                intent['started_at'] = datetime.now()
             
-            query = f"UPDATE jobs SET {', '.join(update_fields)} WHERE job_id = ?"
-            cursor.execute(query, params)
-            conn.commit()
+            if self._status_writer_thread is None:
+                self._status_writer_thread = threading.Thread(
+                    target=self._status_writer_loop, name="job-status-writer", daemon=True
+                )
+                self._status_writer_thread.start()
+        
+        self._status_flush_event.set()
+    
+    def _status_writer_loop(self):
+        """Thread di scrittura degli aggiornamenti di stato coalescenti."""
+        
+        while True:
+            self._status_flush_event.wait()
+            time.sleep(self.status_flush_interval)
+            self._status_flush_event.clear()
             
-            logger.info(f"📊 Job {job_id} status updated to {status.value}")
+            try:
+                self.flush_status_updates()
+            except Exception as e:
+                logger.error(f"Error flushing job status updates: {e}")
     
     def save_job_result(self, job_id: str, result_data: Dict[str, Any], 
-                       large_data: Optional[bytes] = None,
+                       large_data: Optional[LargeData] = None,
                        file_path: Optional[str] = None):
-        """Salva il risultato di un job."""
+        """Salva il risultato di un job.
         
-        with self.pm.lock:
+        large_data può essere bytes, memoryview, PickleBuffer o una sequenza
+        di buffer (es. quelli prodotti da pickle_out_of_band): i buffer vengono
+        scritti in streaming nel blob senza essere concatenati in memoria.
+        """
+        
+        views = _as_memoryviews(large_data)
+        size_bytes = sum(view.nbytes for view in views)
+        
+        with self.pm._writer_lock:
             conn = self.pm._get_connection()
             cursor = conn.cursor()
             
             # Update job with result
             cursor.execute(
                 'UPDATE jobs SET result_data = ? WHERE job_id = ?',
-                (json.dumps(result_data), job_id)
+                (json_dumps(result_data), _uuid_bytes(job_id))
             )
             
             # Save large data separately if provided
-            if large_data or file_path:
-                result_id = str(uuid.uuid4())
+            if size_bytes or file_path:
+                result_id = _new_uuid()
+                stream_blob = size_bytes > 0 and hasattr(conn, 'blobopen')
                 
-                cursor.execute('''
+                if stream_blob:
+                    # Reserve the blob and stream the buffers into it below
+                    blob_sql, blob_param = 'zeroblob(?)', size_bytes
+                else:
+                    blob_sql = '?'
+                    blob_param = b''.join(views) if size_bytes else None
+                
+                cursor.execute(f'''
                     INSERT INTO results (result_id, job_id, result_type, data_blob, 
                                        file_path, created_at, size_bytes)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    VALUES (?, ?, ?, {blob_sql}, ?, ?, ?)
                 ''', (
                     result_id,
-                    job_id,
+                    _uuid_bytes(job_id),
                     result_data.get('type', 'unknown'),
-                    large_data,
+                    blob_param,
                     file_path,
                     datetime.now(),
-                    len(large_data) if large_data else 0
+                    size_bytes
                 ))
+                
+                if stream_blob:
+                    with conn.blobopen('results', 'data_blob', cursor.lastrowid) as blob:
+                        for view in views:
+                            blob.write(view)
             
             conn.commit()
             logger.info(f"💾 Result saved for job {job_id}")
@@ -289,41 +729,47 @@ class JobManager:
     def get_pending_jobs(self, limit: int = 10) -> List[JobRecord]:
         """Recupera job in attesa, ordinati per priorità e data di creazione."""
         
-        with self.pm.lock:
-            conn = self.pm._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT * FROM jobs 
-                WHERE status = ? 
-                ORDER BY priority DESC, created_at ASC 
-                LIMIT ?
-            ''', (JobStatus.PENDING.value, limit))
-            
-            return [self._row_to_job_record(row) for row in cursor.fetchall()]
+        # Status-filtered query: queued status updates must hit the table first
+        self.flush_status_updates()
+        
+        conn = self.pm._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT * FROM jobs 
+            WHERE status = ? 
+            ORDER BY priority DESC, created_at ASC 
+            LIMIT ?
+        ''', (JobStatus.PENDING.value, limit))
+        
+        return [self._row_to_job_record(row) for row in cursor.fetchall()]
     
     def get_jobs_by_status(self, status: JobStatus, limit: int = 100) -> List[JobRecord]:
         """Recupera job per stato."""
         
-        with self.pm.lock:
-            conn = self.pm._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT * FROM jobs 
-                WHERE status = ? 
-                ORDER BY created_at DESC 
-                LIMIT ?
-            ''', (status.value, limit))
-            
-            return [self._row_to_job_record(row) for row in cursor.fetchall()]
+        self.flush_status_updates()
+        
+        conn = self.pm._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT * FROM jobs 
+            WHERE status = ? 
+            ORDER BY created_at DESC 
+            LIMIT ?
+        ''', (status.value, limit))
+        
+        return [self._row_to_job_record(row) for row in cursor.fetchall()]
     
     def cleanup_old_jobs(self, days_old: int = 30):
         """Rimuove job vecchi dal database."""
         
         cutoff_date = datetime.now() - timedelta(days=days_old)
         
-        with self.pm.lock:
+        # Persist deferred writes before touching the database
+        self.pm.flush()
+        
+        with self.pm._writer_lock:
             conn = self.pm._get_connection()
             cursor = conn.cursor()
             
@@ -342,98 +788,92 @@ class JobManager:
     def get_job_statistics(self) -> Dict[str, Any]:
         """Ottiene statistiche sui job."""
         
-        with self.pm.lock:
-            conn = self.pm._get_connection()
-            cursor = conn.cursor()
-            
-            # Count by status
-            cursor.execute('''
-                SELECT status, COUNT(*) as count 
-                FROM jobs 
-                GROUP BY status
-            ''')
-            status_counts = {row['status']: row['count'] for row in cursor.fetchall()}
+        self.flush_status_updates()
+        
+        conn = self.pm._get_connection()
+        cursor = conn.cursor()
+        
+        # Single pass over jobs: per (status, job_type) counts, duration
+        # sums and recent activity, pivoted in Python below
+        yesterday = datetime.now() - timedelta(hours=24)
+        cursor.execute('''
+            SELECT status, job_type,
+                   COUNT(*) as count,
+                   SUM(actual_duration) as total_duration,
+                   COUNT(actual_duration) as duration_count,
+                   SUM(CASE WHEN created_at > ? THEN 1 ELSE 0 END) as recent
+            FROM jobs 
+            GROUP BY status, job_type
+        ''', (yesterday,))
+        
+        status_counts = {}
+        duration_totals = {}
+        recent_jobs = 0
+        
+        for row in cursor.fetchall():
+            status_counts[row['status']] = status_counts.get(row['status'], 0) + row['count']
+            recent_jobs += row['recent']
             
-            # Average duration by job type
-            cursor.execute('''
-                SELECT job_type, AVG(actual_duration) as avg_duration, COUNT(*) as count
-                FROM jobs 
-                WHERE actual_duration IS NOT NULL 
-                GROUP BY job_type
-            ''')
-            duration_stats = {
-                row['job_type']: {
-                    'avg_duration': row['avg_duration'],
-                    'count': row['count']
-                }
-                for row in cursor.fetchall()
+            if row['duration_count']:
+                total, count = duration_totals.get(row['job_type'], (0.0, 0))
+                duration_totals[row['job_type']] = (
+                    total + row['total_duration'], count + row['duration_count']
+                )
+        
+        duration_stats = {
+            job_type: {
+                'avg_duration': total / count,
+                'count': count
             }
+            for job_type, (total, count) in duration_totals.items()
+        }
+        
+        return {
+            'status_counts': status_counts,
+            'duration_stats': duration_stats,
+            'recent_jobs_24h': recent_jobs,
+            'total_jobs': sum(status_counts.values())
+        }
+    
+    def create_jobs_bulk(self, records: List[JobRecord]) -> List[str]:
+        """Salva più job record in un'unica transazione."""
+        
+        with self.pm._writer_lock:
+            conn = self.pm._get_connection()
             
-            # Recent activity (last 24 hours)
-            yesterday = datetime.now() - timedelta(hours=24)
-            cursor.execute('''
-                SELECT COUNT(*) as recent_jobs 
-                FROM jobs 
-                WHERE created_at > ?
-            ''', (yesterday,))
-            recent_jobs = cursor.fetchone()['recent_jobs']
-            
-            return {
-                'status_counts': status_counts,
-                'duration_stats': duration_stats,
-                'recent_jobs_24h': recent_jobs,
-                'total_jobs': sum(status_counts.values())
-            }
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(JOB_INSERT_SQL, [record.as_row() for record in records])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        
+        logger.info(f"✅ {len(records)} jobs created")
+        
+        return [record.job_id for record in records]
     
     def _save_job(self, job_record: JobRecord):
         """Salva un job record nel database."""
         
-        with self.pm.lock:
+        with self.pm._writer_lock:
             conn = self.pm._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO jobs (
-                    job_id, job_type, status, priority, created_at, started_at, 
-                    completed_at, input_data, result_data, error_message, progress,
-                    estimated_duration, actual_duration, worker_id, retry_count,
-                    max_retries, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                job_record.job_id,
-                job_record.job_type,
-                job_record.status.value,
-                job_record.priority.value,
-                job_record.created_at,
-                job_record.started_at,
-                job_record.completed_at,
-                json.dumps(job_record.input_data) if job_record.input_data else None,
-                json.dumps(job_record.result_data) if job_record.result_data else None,
-                job_record.error_message,
-                job_record.progress,
-                job_record.estimated_duration,
-                job_record.actual_duration,
-                job_record.worker_id,
-                job_record.retry_count,
-                job_record.max_retries,
-                json.dumps(job_record.metadata) if job_record.metadata else None
-            ))
-            
+            conn.execute(JOB_INSERT_SQL, job_record.as_row())
             conn.commit()
     
     def _row_to_job_record(self, row: sqlite3.Row) -> JobRecord:
         """Converte una riga del database in JobRecord."""
         
         return JobRecord(
-            job_id=row['job_id'],
+            job_id=to_hex(row['job_id']),
             job_type=row['job_type'],
             status=JobStatus(row['status']),
             priority=JobPriority(row['priority']),
             created_at=datetime.fromisoformat(row['created_at']),
             started_at=datetime.fromisoformat(row['started_at']) if row['started_at'] else None,
             completed_at=datetime.fromisoformat(row['completed_at']) if row['completed_at'] else None,
-            input_data=json.loads(row['input_data']) if row['input_data'] else None,
-            result_data=json.loads(row['result_data']) if row['result_data'] else None,
+            input_data=json_loads(row['input_data']) if row['input_data'] else None,
+            result_data=json_loads(row['result_data']) if row['result_data'] else None,
             error_message=row['error_message'],
             progress=row['progress'],
             estimated_duration=row['estimated_duration'],
@@ -441,70 +881,147 @@ class JobManager:
             worker_id=row['worker_id'],
             retry_count=row['retry_count'],
             max_retries=row['max_retries'],
-            metadata=json.loads(row['metadata']) if row['metadata'] else None
+            metadata=json_loads(row['metadata']) if row['metadata'] else None
         )
     
     def _job_has_started(self, job_id: str) -> bool:
         """Verifica se un job è già stato avviato."""
         
-        with self.pm.lock:
-            conn = self.pm._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT started_at FROM jobs WHERE job_id = ?', (job_id,))
-            row = cursor.fetchone()
-            
-            return row and row['started_at'] is not None
+        conn = self.pm._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT started_at FROM jobs WHERE job_id = ?', (_uuid_bytes(job_id),))
+        row = cursor.fetchone()
+        
+        return row and row['started_at'] is not None
 
 
 class SystemStateManager:
-    """Gestore dello stato del sistema."""
+    """Gestore dello stato del sistema.
     
-    def __init__(self, persistence_manager: PersistenceManager):
+    Gli stati sono mantenuti in una cache in memoria: le letture dopo il primo
+    accesso non toccano SQLite, le scritture vengono accumulate e salvate da
+    un thread in background al termine di una finestra di debounce. Le letture
+    restituiscono copie: per modificare uno stato si usa save_state.
+    """
+    
+    def __init__(self, persistence_manager: PersistenceManager,
+                 flush_interval: float = 0.5):
         self.pm = persistence_manager
+        self.flush_interval = flush_interval
+        
+        self._state_cache: Dict[str, Any] = {}
+        self._state_dirty: Dict[str, str] = {}  # key -> JSON da scrivere
+        self._all_loaded = False
+        self._cache_lock = threading.Lock()
+        
+        self._flush_event = threading.Event()
+        self._flush_thread = None
+        
+        self.pm.register_flush_hook(self.flush)
+        atexit.register(self.flush)
     
     def save_state(self, key: str, value: Any):
         """Salva uno stato del sistema."""
         
-        with self.pm.lock:
-            conn = self.pm._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO system_state (key, value, updated_at)
-                VALUES (?, ?, ?)
-            ''', (key, json.dumps(value), datetime.now()))
+        encoded = json_dumps(value)
+        
+        with self._cache_lock:
+            # Cache a decoded copy so later caller mutations don't leak in
+            self._state_cache[key] = json_loads(encoded)
+            self._state_dirty[key] = encoded
             
-            conn.commit()
+            if self._flush_thread is None:
+                self._flush_thread = threading.Thread(
+                    target=self._flush_loop, name="system-state-flush", daemon=True
+                )
+                self._flush_thread.start()
+        
+        self._flush_event.set()
     
     def get_state(self, key: str, default: Any = None) -> Any:
         """Recupera uno stato del sistema."""
         
-        with self.pm.lock:
-            conn = self.pm._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT value FROM system_state WHERE key = ?', (key,))
-            row = cursor.fetchone()
-            
-            if row:
-                return json.loads(row['value'])
-            
+        with self._cache_lock:
+            if key in self._state_cache:
+                return copy.deepcopy(self._state_cache[key])
+        
+        conn = self.pm._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT value FROM system_state WHERE key = ?', (key,))
+        row = cursor.fetchone()
+        
+        if not row:
             return default
+        
+        with self._cache_lock:
+            # A concurrent save_state wins over the value just read
+            return copy.deepcopy(self._state_cache.setdefault(key, json_loads(row['value'])))
     
     def get_all_states(self) -> Dict[str, Any]:
         """Recupera tutti gli stati del sistema."""
         
-        with self.pm.lock:
+        if not self._all_loaded:
             conn = self.pm._get_connection()
             cursor = conn.cursor()
             
             cursor.execute('SELECT key, value FROM system_state')
+            rows = cursor.fetchall()
             
-            return {
-                row['key']: json.loads(row['value'])
-                for row in cursor.fetchall()
-            }
+            with self._cache_lock:
+                for row in rows:
+                    self._state_cache.setdefault(row['key'], json_loads(row['value']))
+                self._all_loaded = True
+        
+        with self._cache_lock:
+            return copy.deepcopy(self._state_cache)
+    
+    def flush(self):
+        """Scrive su database gli stati modificati in un'unica transazione.
+        
+        Le chiavi escono dall'insieme dirty solo dopo il commit, e solo se
+        nel frattempo save_state non le ha aggiornate: una scrittura fallita
+        viene ritentata al flush successivo.
+        """
+        
+        with self._cache_lock:
+            if not self._state_dirty:
+                return
+            
+            now = datetime.now()
+            written = dict(self._state_dirty)
+        
+        with self.pm._writer_lock:
+            conn = self.pm._get_connection()
+            
+            try:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO system_state (key, value, updated_at)
+                    VALUES (?, ?, ?)
+                ''', [(key, encoded, now) for key, encoded in written.items()])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        
+        with self._cache_lock:
+            for key, encoded in written.items():
+                if self._state_dirty.get(key) is encoded:
+                    del self._state_dirty[key]
+    
+    def _flush_loop(self):
+        """Thread di write-back: un commit per finestra di debounce."""
+        
+        while True:
+            self._flush_event.wait()
+            time.sleep(self.flush_interval)
+            self._flush_event.clear()
+            
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing system state: {e}")
 
 
 class PerformanceTracker:
@@ -513,30 +1030,40 @@ class PerformanceTracker:
     def __init__(self, persistence_manager: PersistenceManager):
         self.pm = persistence_manager
     
+    def audit_query_plans(self) -> List[str]:
+        """Diagnostica: problemi nei piani delle query sulle metriche (vedi audit_query_plan)."""
+        return self.pm.audit_query_plan(METRICS_SELECT_SQL, (None, None))
+    
     def record_metric(self, metric_name: str, value: float, 
                      job_id: Optional[str] = None,
                      metadata: Optional[Dict[str, Any]] = None):
         """Registra una metrica di performance."""
         
-        metric_id = str(uuid.uuid4())
+        self.record_metrics([(metric_name, value, job_id, metadata)])
+    
+    def record_metrics(self, metrics: Sequence[Tuple[str, float, Optional[str], Optional[Dict[str, Any]]]]):
+        """Registra più metriche (nome, valore, job_id, metadata) con un solo commit.
         
-        with self.pm.lock:
-            conn = self.pm._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO performance_metrics 
-                (metric_id, job_id, metric_name, metric_value, timestamp, metadata)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                metric_id,
-                job_id,
+        L'INSERT viene compilato una volta e riusato dalla cache degli
+        statement di sqlite3.
+        """
+        
+        timestamp = datetime.now().isoformat(" ")
+        rows = [
+            (
+                _new_uuid(),
+                _uuid_bytes(job_id),
                 metric_name,
                 value,
-                datetime.now(),
-                json.dumps(metadata) if metadata else None
-            ))
-            
+                timestamp,
+                json_dumps(metadata) if metadata else None
+            )
+            for metric_name, value, job_id, metadata in metrics
+        ]
+        
+        with self.pm._writer_lock:
+            conn = self.pm._get_connection()
+            conn.executemany(METRIC_INSERT_SQL, rows)
             conn.commit()
     
     def get_metrics(self, metric_name: str, hours_back: int = 24) -> List[Dict[str, Any]]:
@@ -544,26 +1071,60 @@ class PerformanceTracker:
         
         since = datetime.now() - timedelta(hours=hours_back)
         
-        with self.pm.lock:
-            conn = self.pm._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT * FROM performance_metrics 
-                WHERE metric_name = ? AND timestamp > ?
-                ORDER BY timestamp DESC
-            ''', (metric_name, since))
-            
-            return [
-                {
-                    'metric_id': row['metric_id'],
-                    'job_id': row['job_id'],
-                    'value': row['metric_value'],
-                    'timestamp': row['timestamp'],
-                    'metadata': json.loads(row['metadata']) if row['metadata'] else None
-                }
-                for row in cursor.fetchall()
-            ]
+        conn = self.pm._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(METRICS_SELECT_SQL, (metric_name, since))
+        
+        return [
+            {
+                'metric_id': to_hex(row['metric_id']),
+                'job_id': to_hex(row['job_id']),
+                'value': row['metric_value'],
+                'timestamp': row['timestamp'],
+                'metadata': json_loads(row['metadata']) if row['metadata'] else None
+            }
+            for row in cursor.fetchall()
+        ]
+    
+    def get_metrics_arrays(self, metric_name: str, hours_back: int = 24,
+                           include_metadata: bool = False) -> Dict[str, Any]:
+        """Recupera metriche per nome in formato colonnare NumPy.
+        
+        Restituisce 'timestamp' (int64, microsecondi dall'epoch del timestamp
+        salvato) e 'value' (float64), ordinati dal più recente. I metadata
+        vengono decodificati solo se include_metadata è True.
+        """
+        
+        if not NUMPY_AVAILABLE:
+            raise ImportError("NumPy not available")
+        
+        since = datetime.now() - timedelta(hours=hours_back)
+        columns = 'timestamp, metric_value, metadata' if include_metadata else 'timestamp, metric_value'
+        
+        conn = self.pm._get_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = None  # Plain tuples, transposed below
+        
+        cursor.execute(f'''
+            SELECT {columns} FROM performance_metrics 
+            WHERE metric_name = ? AND timestamp > ?
+            ORDER BY timestamp DESC
+        ''', (metric_name, since))
+        
+        rows = cursor.fetchall()
+        
+        timestamps, values, *rest = zip(*rows) if rows else ((), (), ())
+        
+        arrays = {
+            'timestamp': np.array(timestamps, dtype='datetime64[us]').astype(np.int64),
+            'value': np.array(values, dtype=np.float64)
+        }
+        
+        if include_metadata:
+            arrays['metadata'] = [json_loads(m) if m else None for m in rest[0]]
+        
+        return arrays
 
 
 # Test and demonstration
@@ -6,108 +6,118 @@ invece delle simulazioni precedenti.
 """
 
 import os
+import re
 import sys
 import json
+import time
+import hashlib
+import functools
+import itertools
+from fractions import Fraction
 import numpy as np
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Iterable, Iterator, Callable, Sequence
 from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import subprocess
 import tempfile
+import threading
 import logging
 
+from PIL import Image, ImageDraw, ImageFont
+
+# Manim (optional): render delle scene in-process
+try:
+    from manim import tempconfig
+    from manim.constants import QUALITIES
+    MANIM_AVAILABLE = True
+except ImportError:
+    MANIM_AVAILABLE = False
+
+# CuPy (optional): accelerazione GPU
+try:
+    import cupy as cp
+    import cupyx
+    from cupy import cublas
+    from cupyx.scipy import fftpack
+    CUPY_AVAILABLE = True
+except ImportError:
+    CUPY_AVAILABLE = False
+
+# PyAV (optional): codifica MP4 in-process, senza sottoprocesso FFmpeg
+try:
+    import av
+    PYAV_AVAILABLE = True
+except ImportError:
+    PYAV_AVAILABLE = False
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class RealManimIntegration:
-    """Integrazione reale con Manim per animazioni matematiche."""
-    
-    def __init__(self, output_dir: str = "./manim_output"):
-        self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(exist_ok=True)
-        self.manim_available = self._check_manim_availability()
-        
-    def _check_manim_availability(self) -> bool:
-        """Verifica se Manim è disponibile e funzionante."""
-        try:
-            import manim as mn
-            logger.info("✅ Manim importato con successo")
-            return True
-        except ImportError:
-            logger.warning("⚠️  Manim non disponibile, usando fallback")
-            return False
-    
-    def create_lambda_animation(self, expression: str, scene_config: Dict[str, Any]) -> Dict[str, Any]:
-        """Crea un'animazione reale usando Manim."""
-        
-        if not self.manim_available:
-            return self._fallback_animation(expression, scene_config)
-        
-        try:
-            # Import Manim components
-            from manim import Scene, Text, MathTex, Create, Transform, FadeIn, FadeOut
-            from manim import config as manim_config
-            
-            # Configure Manim
-            manim_config.media_dir = str(self.output_dir)
-            manim_config.quality = scene_config.get('quality', 'medium_quality')
-            
-            # Create scene class dynamically
-            scene_code = self._generate_scene_code(expression, scene_config)
-            
-            # Write scene to temporary file
-            scene_file = self.output_dir / f"lambda_scene_{hash(expression)}.py"
-            with open(scene_file, 'w') as f:
-                f.write(scene_code)
-            
-            # Execute Manim rendering
-            cmd = [
-                sys.executable, "-m", "manim",
-                str(scene_file),
-                "LambdaScene",
-                f"--quality={scene_config.get('quality', 'medium_quality')}",
-                f"--output_file=lambda_animation_{hash(expression)}"
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, cwd=str(self.output_dir))
-            
-            if result.returncode == 0:
-                # Find generated video file
-                video_files = list(self.output_dir.glob("*.mp4"))
-                if video_files:
-                    return {
-                        "success": True,
-                        "video_path": str(video_files[-1]),
-                        "frames": self._extract_frames(video_files[-1]),
-                        "metadata": {
-                            "expression": expression,
-                            "duration": scene_config.get('duration', 3.0),
-                            "quality": scene_config.get('quality', 'medium_quality')
-                        }
-                    }
-            
-            logger.error(f"Manim rendering failed: {result.stderr}")
-            return self._fallback_animation(expression, scene_config)
-            
-        except Exception as e:
-            logger.error(f"Error in Manim integration: {e}")
-            return self._fallback_animation(expression, scene_config)
-    
-    def _generate_scene_code(self, expression: str, config: Dict[str, Any]) -> str:
-        """Genera il codice Python per la scena Manim."""
-        
-        return f'''
+# Rendering/encoding settings shared by the video output paths
+FRAME_SIZE = (1920, 1080)
+
+# Variabili di un'espressione lambda in una sola passata: legate (λx) o libere
+_VARIABLE_RE = re.compile(r'λ([a-zA-Z])|(?<!λ)(?<!\.)([a-zA-Z])(?!\s*\.)')
+
+# Layout dei frame JSON renderizzati da RealVideoOutput
+PROGRESS_BAR_ORIGIN = (100, 400)
+PROGRESS_BAR_SIZE = (800, 20)
+TEXT_COLOR = (0, 0, 0)
+ANALYSIS_COLOR = (0, 0, 255)
+PROGRESS_COLOR = (0, 128, 0)
+TEXT_MASK_CACHE_SIZE = 256
+
+# Frame minimi per segmento quando frames_to_video codifica in parallelo
+SEGMENT_MIN_FRAMES = 30
+
+# Numero massimo di kernel GPU (piani FFT inclusi) tenuti in cache
+KERNEL_CACHE_SIZE = 32
+
+QUALITY_SETTINGS = {
+    "low": ["-crf", "28"],
+    "medium": ["-crf", "23"],
+    "high": ["-crf", "18"],
+    "lossless": ["-crf", "0"]
+}
+
+# Nomi di qualità accettati -> chiave di manim.constants.QUALITIES
+MANIM_QUALITIES = {
+    "low": "low_quality", "l": "low_quality",
+    "medium": "medium_quality", "m": "medium_quality",
+    "high": "high_quality", "h": "high_quality",
+    "production": "production_quality", "p": "production_quality",
+    "lossless": "production_quality",
+    "ultra": "fourk_quality", "fourk": "fourk_quality", "k": "fourk_quality",
+    **{name: name for name in (
+        "low_quality", "medium_quality", "high_quality",
+        "production_quality", "fourk_quality"
+    )}
+}
+
+# Opzioni NVENC; la qualità di QUALITY_SETTINGS diventa -cq (lossless resta su libx264)
+NVENC_SETTINGS = ["-preset", "p4", "-tune", "ll", "-rc", "vbr"]
+
+# Serializza i render Manim in-process (config di Manim è globale)
+_MANIM_RENDER_LOCK = threading.Lock()
+
+# Sorgente della scena Manim: i valori dell'utente arrivano come dati in
+# SCENE_PARAMS, mai formattati nel codice
+_SCENE_SOURCE = '''
 from manim import *
 import numpy as np
 
 class LambdaScene(Scene):
     def construct(self):
+        params = SCENE_PARAMS
+        
         # Title
         title = Text("Lambda Expression Analysis", font_size=36)
         title.to_edge(UP)
         
         # Main expression
-        expr = MathTex(r"{self._latex_escape(expression)}", font_size=48)
+        expr = MathTex(params["latex_expression"], font_size=48)
         expr.set_color(BLUE)
         
         # Analysis components
@@ -115,13 +125,11 @@ class LambdaScene(Scene):
         analysis_text.next_to(expr, DOWN, buff=1)
         
         # Variables
-        variables = self._extract_variables(expression)
-        var_text = Text(f"Variables: {{', '.join(variables)}}", font_size=20)
+        var_text = Text("Variables: " + params["variables"], font_size=20)
         var_text.next_to(analysis_text, DOWN, buff=0.5)
         
         # Complexity
-        complexity = len(expression)
-        comp_text = Text(f"Complexity: {{complexity}}", font_size=20)
+        comp_text = Text(f"Complexity: {params['complexity']}", font_size=20)
         comp_text.next_to(var_text, DOWN, buff=0.3)
         
         # Animation sequence
@@ -138,10 +146,10 @@ class LambdaScene(Scene):
         self.wait(0.5)
         
         self.play(FadeIn(comp_text))
-        self.wait({config.get('duration', 2.0)})
+        self.wait(params["duration"])
         
         # Beta reduction animation if applicable
-        if self._has_application(expression):
+        if params["has_application"]:
             self._animate_beta_reduction(expr)
         
         self.wait(1)
@@ -166,6 +174,198 @@ class LambdaScene(Scene):
             self.play(FadeIn(step_text))
             self.wait(0.8)
 '''
+
+_SCENE_CODE = compile(_SCENE_SOURCE, '<lambda_scene>', 'exec')
+
+class RealManimIntegration:
+    """Integrazione reale con Manim per animazioni matematiche."""
+    
+    def __init__(self, output_dir: str = "./manim_output"):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.manim_available = self._check_manim_availability()
+        
+        # Cache dei render: chiave della scena -> video, persistente tra i riavvii
+        self.cache_file = self.output_dir / ".cache.json"
+        self._render_cache = self._load_render_cache()
+        self._render_cache_lock = threading.Lock()
+        
+    def _check_manim_availability(self) -> bool:
+        """Verifica se Manim è disponibile e funzionante."""
+        if MANIM_AVAILABLE:
+            logger.info("✅ Manim importato con successo")
+        else:
+            logger.warning("⚠️  Manim non disponibile, usando fallback")
+        return MANIM_AVAILABLE
+    
+    def create_lambda_animation(self, expression: str, scene_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Crea un'animazione reale usando Manim."""
+        
+        if not self.manim_available:
+            return self._fallback_animation(expression, scene_config)
+        
+        try:
+            quality = self._manim_quality(scene_config.get('quality', 'medium_quality'))
+            scene_params = self._scene_params(expression, scene_config)
+            
+            # Stessa scena e stessa qualità producono lo stesso video
+            key = hashlib.blake2b(
+                (_SCENE_SOURCE + json.dumps(scene_params, sort_keys=True) + quality).encode('utf-8'),
+                digest_size=8
+            ).hexdigest()
+            video_path = self._cached_video(key)
+            
+            if video_path is None:
+                video_path = self._render_scene(scene_params, key, quality)
+            
+            if video_path is not None:
+                return {
+                    "success": True,
+                    "video_path": str(video_path),
+                    "metadata": {
+                        "expression": expression,
+                        "duration": scene_config.get('duration', 3.0),
+                        "quality": quality
+                    }
+                }
+            
+            return self._fallback_animation(expression, scene_config)
+            
+        except Exception as e:
+            logger.error(f"Error in Manim integration: {e}")
+            return self._fallback_animation(expression, scene_config)
+    
+    def _render_scene(self, scene_params: Dict[str, Any], key: str, quality: str) -> Optional[Path]:
+        """Renderizza la scena con Manim e registra il video nella cache."""
+        
+        output_file = f"lambda_animation_{key}"
+        try:
+            video_path = self._render_in_process(scene_params, quality, output_file)
+        except Exception as e:
+            logger.warning(f"Render Manim in-process fallito, uso il sottoprocesso: {e}")
+            video_path = self._render_subprocess(scene_params, key, quality, output_file)
+        
+        if video_path is not None:
+            # Percorso stabile: le richieste successive controllano solo che esista
+            video_path = video_path.replace(self._video_path(key))
+            with self._render_cache_lock:
+                self._render_cache[key] = str(video_path)
+                self._save_render_cache()
+        return video_path
+    
+    def _render_in_process(self, scene_params: Dict[str, Any], quality: str,
+                           output_file: str) -> Optional[Path]:
+        """Renderizza LambdaScene nel processo corrente, senza avviare un interprete."""
+        namespace: Dict[str, Any] = {"SCENE_PARAMS": scene_params}
+        exec(_SCENE_CODE, namespace)
+        scene_class = namespace['LambdaScene']
+        
+        # La configurazione di Manim è globale: un render alla volta
+        with _MANIM_RENDER_LOCK, tempconfig({
+            "quality": quality,
+            "media_dir": str(self.output_dir),
+            "output_file": output_file
+        }):
+            scene = scene_class()
+            scene.render()
+            video_path = Path(scene.renderer.file_writer.movie_file_path)
+        
+        return video_path if video_path.exists() else None
+    
+    def _render_subprocess(self, scene_params: Dict[str, Any], key: str, quality: str,
+                           output_file: str) -> Optional[Path]:
+        """Fallback: renderizza la scena con un processo manim separato."""
+        
+        scene_file = self.output_dir / f"lambda_scene_{key}.py"
+        if not scene_file.exists():
+            # I parametri entrano nel file solo come letterale stringa JSON
+            params_json = json.dumps(scene_params)
+            scene_file.write_text(
+                f"import json\nSCENE_PARAMS = json.loads({params_json!r})\n{_SCENE_SOURCE}",
+                encoding='utf-8'
+            )
+        
+        cmd = [
+            sys.executable, "-m", "manim",
+            str(scene_file),
+            "LambdaScene",
+            f"--quality={QUALITIES[quality]['flag']}",  # la CLI accetta l, m, h, p, k
+            f"--media_dir={self.output_dir}",
+            f"--output_file={output_file}"
+        ]
+        
+        result = subprocess.run(cmd, capture_output=True, text=True, cwd=str(self.output_dir))
+        
+        if result.returncode != 0:
+            logger.error(f"Manim rendering failed: {result.stderr}")
+            return None
+        
+        # Percorso noto di Manim: media_dir/videos/<scena>/<altezza>p<fps>/<output_file>.mp4
+        settings = QUALITIES[quality]
+        video_path = (self.output_dir / "videos" / scene_file.stem
+                      / f"{settings['pixel_height']}p{settings['frame_rate']}"
+                      / f"{output_file}.mp4")
+        return video_path if video_path.exists() else None
+    
+    @staticmethod
+    def _manim_quality(quality: str) -> str:
+        """Normalizza un nome di qualità ("high", "h", "high_quality") per Manim."""
+        normalized = MANIM_QUALITIES.get(quality)
+        if normalized is None:
+            logger.warning(f"Qualità Manim sconosciuta '{quality}', uso medium_quality")
+            return "medium_quality"
+        return normalized
+    
+    def _cached_video(self, key: str) -> Optional[Path]:
+        """Restituisce il video già renderizzato per key, se esiste ancora."""
+        video_path = Path(self._render_cache.get(key) or self._video_path(key))
+        if video_path.exists():
+            return video_path
+        
+        with self._render_cache_lock:
+            self._render_cache.pop(key, None)
+        return None
+    
+    def _video_path(self, key: str) -> Path:
+        """Percorso del video renderizzato per key."""
+        return self.output_dir / f"lambda_animation_{key}.mp4"
+    
+    def _load_render_cache(self) -> Dict[str, str]:
+        """Carica la cache dei render da output_dir/.cache.json."""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_render_cache(self):
+        """Salva la cache dei render (scrittura atomica, chiamare con _render_cache_lock).
+        
+        Il JSON va in un file temporaneo univoco nella stessa directory e
+        sostituisce l'indice con os.replace: un lettore vede sempre un file
+        completo, anche con più processi che renderizzano insieme.
+        """
+        temp_file = None
+        try:
+            fd, temp_file = tempfile.mkstemp(dir=self.output_dir, prefix='.cache.', suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._render_cache, f)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            logger.warning(f"Impossibile salvare la cache dei render: {e}")
+            if temp_file is not None and os.path.exists(temp_file):
+                os.unlink(temp_file)
+    
+    def _scene_params(self, expression: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Parametri della scena Manim, passati come dati a LambdaScene."""
+        
+        return {
+            "latex_expression": self._latex_escape(expression),
+            "variables": ', '.join(sorted(self._extract_variables(expression))),
+            "complexity": len(expression),
+            "duration": float(config.get('duration', 2.0)),
+            "has_application": self._has_application(expression)
+        }
     
     def _latex_escape(self, expression: str) -> str:
         """Converte espressione lambda in LaTeX."""
@@ -177,62 +377,20 @@ class LambdaScene(Scene):
     
     def _extract_variables(self, expression: str) -> List[str]:
         """Estrae variabili dall'espressione."""
-        import re
-        variables = re.findall(r'λ([a-zA-Z])', expression)
-        free_vars = re.findall(r'(?<!λ)(?<!\.)([a-zA-Z])(?!\s*\.)', expression)
-        return list(set(variables + free_vars))
+        return list({match.group(match.lastindex) for match in _VARIABLE_RE.finditer(expression)})
     
     def _has_application(self, expression: str) -> bool:
         """Verifica se l'espressione ha applicazioni."""
         return '(' in expression and ')' in expression
     
-    def _extract_frames(self, video_path: Path) -> List[str]:
-        """Estrae frame dal video usando FFmpeg."""
-        try:
-            frames_dir = self.output_dir / "frames"
-            frames_dir.mkdir(exist_ok=True)
-            
-            cmd = [
-                "ffmpeg", "-i", str(video_path),
-                "-vf", "fps=10",  # 10 frames per second
-                str(frames_dir / "frame_%04d.png"),
-                "-y"  # Overwrite existing files
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                frame_files = sorted(frames_dir.glob("frame_*.png"))
-                return [str(f) for f in frame_files]
-            else:
-                logger.warning(f"FFmpeg frame extraction failed: {result.stderr}")
-                return []
-                
-        except Exception as e:
-            logger.error(f"Error extracting frames: {e}")
-            return []
-    
     def _fallback_animation(self, expression: str, config: Dict[str, Any]) -> Dict[str, Any]:
         """Fallback quando Manim non è disponibile."""
         logger.info("Using fallback animation generation")
         
         # Generate simple text-based animation frames
-        frames = []
         duration = config.get('duration', 3.0)
         fps = config.get('fps', 10)
-        total_frames = int(duration * fps)
-        
-        for i in range(total_frames):
-            frame = {
-                "frame_number": i,
-                "timestamp": i / fps,
-                "content": {
-                    "expression": expression,
-                    "progress": i / total_frames,
-                    "analysis": f"Frame {i+1}/{total_frames}"
-                }
-            }
-            frames.append(frame)
+        frames = FallbackFrames(expression, fps, int(duration * fps))
         
         return {
             "success": True,
@@ -246,6 +404,58 @@ class LambdaScene(Scene):
         }
 
 
+class FallbackFrames(Sequence):
+    """Frame testuali del fallback, costruiti su richiesta.
+    
+    Si comporta come la lista di dict che sostituisce, ma non la alloca:
+    chi scorre i frame (es. lo streaming verso FFmpeg) crea un dict alla volta.
+    """
+    
+    __slots__ = ('expression', 'fps', 'total_frames')
+    
+    def __init__(self, expression: str, fps: int, total_frames: int):
+        self.expression = expression
+        self.fps = fps
+        self.total_frames = total_frames
+    
+    def __len__(self) -> int:
+        return self.total_frames
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._frame(i) for i in range(*index.indices(self.total_frames))]
+        if index < 0:
+            index += self.total_frames
+        if not 0 <= index < self.total_frames:
+            raise IndexError("frame index out of range")
+        return self._frame(index)
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return map(self._frame, range(self.total_frames))
+    
+    def _frame(self, i: int) -> Dict[str, Any]:
+        return {
+            "frame_number": i,
+            "timestamp": i / self.fps,
+            "content": {
+                "expression": self.expression,
+                "progress": i / self.total_frames,
+                "analysis": f"Frame {i+1}/{self.total_frames}"
+            }
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def _static_device_info(device_id: int) -> Tuple[str, str, int]:
+    """Nome, compute capability e memoria totale della GPU (una query per device)."""
+    properties = cp.cuda.runtime.getDeviceProperties(device_id)
+    return (
+        properties['name'].decode(),
+        f"{properties['major']}.{properties['minor']}",
+        properties['totalGlobalMem']
+    )
+
+
 class RealGPUAcceleration:
     """Integrazione reale con CuPy per accelerazione GPU."""
     
@@ -253,18 +463,23 @@ class RealGPUAcceleration:
         self.cupy_available = self._check_cupy_availability()
         self.device_info = self._get_device_info()
         
+        # Stream CUDA (upload, calcolo, download) per accelerated_batch
+        self._streams = None
+        # Kernel per (operation, shape, dtype): piani FFT e kernel fusi riutilizzati
+        self._kernel_cache: Dict[Tuple, Callable] = {}
+        
     def _check_cupy_availability(self) -> bool:
         """Verifica disponibilità CuPy e CUDA."""
+        if not CUPY_AVAILABLE:
+            logger.warning("⚠️  CuPy non disponibile")
+            return False
+        
         try:
-            import cupy as cp
             # Test basic operation
             test_array = cp.array([1, 2, 3])
             result = cp.sum(test_array)
             logger.info(f"✅ CuPy disponibile, test result: {result}")
             return True
-        except ImportError:
-            logger.warning("⚠️  CuPy non disponibile")
-            return False
         except Exception as e:
             logger.warning(f"⚠️  CuPy disponibile ma CUDA non funzionante: {e}")
             return False
@@ -275,67 +490,72 @@ class RealGPUAcceleration:
             return {"type": "CPU", "name": "CPU Fallback", "memory": "System RAM"}
         
         try:
-            import cupy as cp
-            device = cp.cuda.Device()
+            name, compute_capability, total_memory = _static_device_info(cp.cuda.Device().id)
             
             return {
                 "type": "GPU",
-                "name": device.attributes['Name'].decode(),
-                "compute_capability": f"{device.compute_capability[0]}.{device.compute_capability[1]}",
-                "memory": f"{device.mem_info[1] // 1024**2} MB",
-                "free_memory": f"{device.mem_info[0] // 1024**2} MB"
+                "name": name,
+                "compute_capability": compute_capability,
+                "memory": f"{total_memory // 1024**2} MB",
+                "free_memory": f"{cp.cuda.runtime.memGetInfo()[0] // 1024**2} MB"
             }
         except Exception as e:
             logger.error(f"Error getting device info: {e}")
             return {"type": "CPU", "name": "CPU Fallback", "error": str(e)}
     
-    def accelerated_computation(self, data: np.ndarray, operation: str) -> Dict[str, Any]:
-        """Esegue computazione accelerata su GPU."""
+    def accelerated_computation(self, data: np.ndarray, operation: str,
+                                serialize: bool = False, on_device: bool = False,
+                                profile: bool = False) -> Dict[str, Any]:
+        """Esegue computazione accelerata su GPU.
+        
+        Il risultato è un ndarray; serialize=True lo converte in liste (solo per
+        confini JSON che non usano utils.json_encoding). Con on_device=True resta
+        un cp.ndarray in memoria GPU, pronto per operazioni successive.
+        I tempi in "performance" sono misurati solo con profile=True.
+        """
         
         if not self.cupy_available:
-            return self._cpu_fallback(data, operation)
+            return self._cpu_fallback(data, operation, serialize, profile)
         
         try:
-            import cupy as cp
-            import time
+            
+            if not profile:
+                result_gpu = self._gpu_compute(cp.asarray(data), operation)
+                result = result_gpu if on_device and not serialize else cp.asnumpy(result_gpu)
+                
+                return {
+                    "success": True,
+                    "result": self._format_result(result, serialize),
+                    "performance": None,
+                    "device": self.device_info
+                }
+            
+            # I kernel sono asincroni: si sincronizza prima di ogni misura
+            stream = cp.cuda.get_current_stream()
             
             # Transfer data to GPU
-            start_time = time.time()
+            start_ns = time.perf_counter_ns()
             gpu_data = cp.asarray(data)
-            transfer_time = time.time() - start_time
+            stream.synchronize()
+            uploaded_ns = time.perf_counter_ns()
             
             # Perform computation on GPU
-            start_compute = time.time()
-            
-            if operation == "matrix_multiply":
-                result_gpu = cp.dot(gpu_data, gpu_data.T)
-            elif operation == "eigenvalues":
-                result_gpu = cp.linalg.eigvals(gpu_data)
-            elif operation == "fft":
-                result_gpu = cp.fft.fft(gpu_data)
-            elif operation == "svd":
-                u, s, v = cp.linalg.svd(gpu_data)
-                result_gpu = s
-            else:
-                result_gpu = cp.sum(gpu_data, axis=0)
-            
-            compute_time = time.time() - start_compute
+            result_gpu = self._gpu_compute(gpu_data, operation)
+            stream.synchronize()
+            computed_ns = time.perf_counter_ns()
             
             # Transfer result back to CPU
-            start_transfer_back = time.time()
-            result_cpu = cp.asnumpy(result_gpu)
-            transfer_back_time = time.time() - start_transfer_back
-            
-            total_time = transfer_time + compute_time + transfer_back_time
+            result = result_gpu if on_device and not serialize else cp.asnumpy(result_gpu)
+            end_ns = time.perf_counter_ns()
             
             return {
                 "success": True,
-                "result": result_cpu.tolist() if result_cpu.ndim <= 2 else "Large array",
+                "result": self._format_result(result, serialize),
                 "performance": {
-                    "total_time": total_time,
-                    "transfer_to_gpu": transfer_time,
-                    "compute_time": compute_time,
-                    "transfer_to_cpu": transfer_back_time,
+                    "total_time": (end_ns - start_ns) / 1e9,
+                    "transfer_to_gpu": (uploaded_ns - start_ns) / 1e9,
+                    "compute_time": (computed_ns - uploaded_ns) / 1e9,
+                    "transfer_to_cpu": (end_ns - computed_ns) / 1e9,
                     "speedup": self._estimate_speedup(operation, data.shape)
                 },
                 "device": self.device_info
@@ -343,39 +563,249 @@ class RealGPUAcceleration:
             
         except Exception as e:
             logger.error(f"GPU computation failed: {e}")
-            return self._cpu_fallback(data, operation)
+            return self._cpu_fallback(data, operation, serialize, profile)
     
-    def _cpu_fallback(self, data: np.ndarray, operation: str) -> Dict[str, Any]:
-        """Fallback su CPU quando GPU non disponibile."""
-        import time
+    def accelerated_batch(self, arrays: Iterable[np.ndarray], operation: str,
+                          depth: int = 2, serialize: bool = False,
+                          profile: bool = False) -> Dict[str, Any]:
+        """Esegue operation su una sequenza di array con trasferimenti in pipeline.
+        
+        Upload, calcolo e download girano su tre stream CUDA: l'upload
+        dell'array successivo si sovrappone al calcolo di quello corrente e al
+        download del precedente. depth limita gli array in volo sulla GPU.
+        """
+        
+        arrays = list(arrays)
+        
+        if not self.cupy_available:
+            return self._cpu_batch_fallback(arrays, operation, serialize, profile)
+        
+        try:
+            upload, compute, download = self._get_streams()
+            in_flight = []  # (input pinned, array GPU, risultato GPU, output pinned, evento di fine)
+            outputs = []
+            
+            start_ns = time.perf_counter_ns() if profile else 0
+            for data in arrays:
+                # Copia host -> pinned -> GPU sullo stream di upload; i buffer pinned
+                # vengono dal pool di default che CuPy installa all'import
+                pinned = cupyx.empty_pinned(data.shape, data.dtype)
+                pinned[...] = data
+                gpu_data = cp.empty(data.shape, data.dtype)
+                gpu_data.set(pinned, stream=upload)
+                uploaded = upload.record()
+                
+                compute.wait_event(uploaded)
+                with compute:
+                    result_gpu = self._gpu_compute(gpu_data, operation)
+                computed = compute.record()
+                
+                download.wait_event(computed)
+                host_result = cupyx.empty_pinned(result_gpu.shape, result_gpu.dtype)
+                result_gpu.get(stream=download, out=host_result)
+                in_flight.append((pinned, gpu_data, result_gpu, host_result, download.record()))
+                
+                # Il buffer pinned di input e gli array GPU restano referenziati finché
+                # il download non termina: l'evento di fine segue l'upload (via compute),
+                # quindi il pool non riusa il buffer mentre la copia asincrona è in corso
+                while len(in_flight) > depth:
+                    outputs.append(self._wait_download(in_flight.pop(0)))
+            
+            while in_flight:
+                outputs.append(self._wait_download(in_flight.pop(0)))
+            
+            performance = None
+            if profile:
+                performance = {
+                    "total_time": (time.perf_counter_ns() - start_ns) / 1e9,
+                    "batch_size": len(outputs),
+                    "pipelined": True
+                }
+            
+            return {
+                "success": True,
+                "results": [self._format_result(result, serialize) for result in outputs],
+                "performance": performance,
+                "device": self.device_info
+            }
+            
+        except Exception as e:
+            logger.error(f"GPU batch computation failed: {e}")
+            return self._cpu_batch_fallback(arrays, operation, serialize, profile)
+    
+    def batched_computation(self, arrays: List[np.ndarray], operation: str,
+                            serialize: bool = False) -> Dict[str, Any]:
+        """Esegue operation su molti array della stessa forma con un solo lancio.
+        
+        Gli array vengono impilati (su GPU: in un buffer pinned, un solo
+        trasferimento) e le routine batched di cuBLAS/cuSOLVER/cuFFT li
+        elaborano insieme. Forme diverse passano per accelerated_batch.
+        """
+        
+        if not arrays:
+            return {"success": True, "results": [], "performance": None,
+                    "device": self.device_info}
+        
+        shape, dtype = arrays[0].shape, arrays[0].dtype
+        if any(data.shape != shape for data in arrays):
+            return self.accelerated_batch(arrays, operation, serialize=serialize)
+        
+        if self.cupy_available:
+            try:
+                staging = cupyx.empty_pinned((len(arrays),) + shape, dtype)
+                np.stack(arrays, out=staging)
+                result = cp.asnumpy(self._stacked_compute(cp, cp.asarray(staging), operation))
+                device = self.device_info
+            except Exception as e:
+                logger.error(f"GPU batched computation failed: {e}")
+                result = self._stacked_compute(np, np.stack(arrays), operation)
+                device = {"type": "CPU", "name": "CPU Fallback"}
+        else:
+            result = self._stacked_compute(np, np.stack(arrays), operation)
+            device = {"type": "CPU", "name": "CPU Fallback"}
         
-        start_time = time.time()
+        return {
+            "success": True,
+            "results": [self._format_result(item, serialize) for item in result],
+            "performance": None,
+            "device": device
+        }
+    
+    def _stacked_compute(self, xp: Any, stack: Any, operation: str) -> Any:
+        """Applica operation a ogni elemento del primo asse (xp: numpy o cupy)."""
         
         if operation == "matrix_multiply":
-            result = np.dot(data, data.T)
+            if stack.ndim == 2:
+                # Vettori: x · x
+                return xp.einsum('ij,ij->i', stack, stack)
+            return xp.matmul(stack, stack.swapaxes(-1, -2))
         elif operation == "eigenvalues":
-            result = np.linalg.eigvals(data)
+            if xp.allclose(stack, stack.swapaxes(-1, -2)):
+                return xp.linalg.eigvalsh(stack)
+            return xp.stack([xp.linalg.eigvals(matrix) for matrix in stack])
         elif operation == "fft":
-            result = np.fft.fft(data)
+            return xp.fft.fft(stack, axis=-1)
         elif operation == "svd":
-            u, s, v = np.linalg.svd(data)
-            result = s
+            return xp.linalg.svd(stack, compute_uv=False)
         else:
-            result = np.sum(data, axis=0)
+            return xp.sum(stack, axis=1)
+    
+    def _get_streams(self) -> Tuple[Any, Any, Any]:
+        """Crea (una volta) gli stream non bloccanti di upload, calcolo e download."""
+        if self._streams is None:
+            self._streams = tuple(cp.cuda.Stream(non_blocking=True) for _ in range(3))
+        return self._streams
+    
+    def _wait_download(self, in_flight: Tuple[np.ndarray, Any, Any, np.ndarray, Any]) -> np.ndarray:
+        """Attende il download di un risultato e restituisce l'array host."""
+        _, _, _, host_result, done = in_flight
+        done.synchronize()
+        return host_result
+    
+    def _gpu_compute(self, gpu_data: Any, operation: str) -> Any:
+        """Esegue operation su un array già in memoria GPU."""
+        return self._get_kernel(operation, gpu_data.shape, gpu_data.dtype)(gpu_data)
+    
+    def _get_kernel(self, operation: str, shape: Tuple, dtype: Any) -> Callable:
+        """Restituisce il kernel compilato per (operation, shape, dtype), creandolo se manca."""
+        key = (operation, shape, dtype)
+        kernel = self._kernel_cache.get(key)
+        
+        if kernel is None:
+            if len(self._kernel_cache) >= KERNEL_CACHE_SIZE:
+                # Evict the oldest entry (dict keeps insertion order)
+                del self._kernel_cache[next(iter(self._kernel_cache))]
+            kernel = self._kernel_cache[key] = self._build_kernel(operation, shape, dtype)
+        
+        return kernel
+    
+    def _build_kernel(self, operation: str, shape: Tuple, dtype: Any) -> Callable:
+        """Prepara una volta piani FFT, chiamate cuBLAS e kernel fusi."""
+        
+        if operation == "matrix_multiply":
+            if len(shape) == 2 and dtype.kind in 'fc':
+                # gemm diretto: niente dispatch e controlli di cp.dot
+                return lambda x: cublas.gemm('N', 'T', x, x)
+            return lambda x: cp.dot(x, x.T)
+        elif operation == "eigenvalues":
+            # Matrici simmetriche (es. data @ data.T): eigvalsh è 3-4x più veloce
+            return lambda x: (cp.linalg.eigvalsh(x) if cp.allclose(x, x.T)
+                              else cp.linalg.eigvals(x))
+        elif operation == "fft":
+            complex_dtype = np.result_type(dtype, np.complex64)
+            plan = fftpack.get_fft_plan(cp.empty(shape, complex_dtype), axes=-1)
+            
+            def fft(x):
+                with plan:
+                    return cp.fft.fft(x.astype(complex_dtype, copy=False))
+            return fft
+        elif operation == "svd":
+            return lambda x: cp.linalg.svd(x, compute_uv=False)
+        else:
+            @cp.fuse()
+            def column_sum(x):
+                return cp.sum(x, axis=0)
+            return column_sum
+    
+    def _cpu_batch_fallback(self, arrays: List[np.ndarray], operation: str,
+                            serialize: bool = False, profile: bool = False) -> Dict[str, Any]:
+        """Fallback su CPU di accelerated_batch."""
+        results = [self._cpu_fallback(data, operation, serialize, profile) for data in arrays]
         
-        compute_time = time.time() - start_time
+        performance = None
+        if profile:
+            performance = {
+                "total_time": sum(result["performance"]["total_time"] for result in results),
+                "batch_size": len(results),
+                "device": "CPU"
+            }
         
         return {
             "success": True,
-            "result": result.tolist() if result.ndim <= 2 else "Large array",
-            "performance": {
+            "results": [result["result"] for result in results],
+            "performance": performance,
+            "device": {"type": "CPU", "name": "CPU Fallback"}
+        }
+    
+    def _cpu_fallback(self, data: np.ndarray, operation: str,
+                      serialize: bool = False, profile: bool = False) -> Dict[str, Any]:
+        """Fallback su CPU quando GPU non disponibile."""
+        start_ns = time.perf_counter_ns() if profile else 0
+        
+        if operation == "matrix_multiply":
+            result = np.dot(data, data.T)
+        elif operation == "eigenvalues":
+            # Matrici simmetriche (es. data @ data.T): eigvalsh è 3-4x più veloce
+            result = np.linalg.eigvalsh(data) if np.allclose(data, data.T) else np.linalg.eigvals(data)
+        elif operation == "fft":
+            result = np.fft.fft(data)
+        elif operation == "svd":
+            result = np.linalg.svd(data, compute_uv=False)
+        else:
+            result = np.sum(data, axis=0)
+        
+        performance = None
+        if profile:
+            compute_time = (time.perf_counter_ns() - start_ns) / 1e9
+            performance = {
                 "total_time": compute_time,
                 "compute_time": compute_time,
                 "device": "CPU"
-            },
+            }
+        
+        return {
+            "success": True,
+            "result": self._format_result(result, serialize),
+            "performance": performance,
             "device": {"type": "CPU", "name": "CPU Fallback"}
         }
     
+    def _format_result(self, result: Any, serialize: bool) -> Any:
+        """Restituisce l'array così com'è, o in liste Python se serialize."""
+        if not serialize:
+            return result
+        return result.tolist() if result.ndim <= 2 else "Large array"
+    
     def _estimate_speedup(self, operation: str, shape: Tuple) -> float:
         """Stima il speedup GPU vs CPU."""
         # Stime basate su benchmark tipici
@@ -389,13 +819,58 @@ class RealGPUAcceleration:
         return speedup_estimates.get(operation, 2.0)
 
 
+@functools.lru_cache(maxsize=None)
+def _probe_nvenc(backend: str) -> bool:
+    """True se h264_nvenc si apre davvero con backend (un probe per processo).
+    
+    'pyav' prova la libav inclusa in PyAV, 'ffmpeg' il binario di sistema
+    usato da stream_frames_to_video: possono avere encoder diversi.
+    """
+    if backend == 'pyav':
+        if 'h264_nvenc' not in av.codecs_available:
+            return False
+        try:
+            context = av.CodecContext.create('h264_nvenc', 'w')
+            context.width, context.height = 256, 256
+            context.pix_fmt = 'yuv420p'
+            context.time_base = Fraction(1, 30)
+            context.open()
+        except Exception:
+            return False
+    else:
+        result = subprocess.run([
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", "color=size=256x256",
+            "-frames:v", "1", "-c:v", "h264_nvenc", "-f", "null", "-"
+        ], capture_output=True)
+        if result.returncode != 0:
+            return False
+    
+    logger.info(f"✅ Encoder hardware NVENC disponibile ({backend})")
+    return True
+
+
 class RealVideoOutput:
     """Sistema reale per generazione video usando FFmpeg."""
     
-    def __init__(self, output_dir: str = "./video_output"):
+    def __init__(self, output_dir: str = "./video_output", hardware_encoding: bool = True):
         self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(exist_ok=True)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
         self.ffmpeg_available = self._check_ffmpeg_availability()
+        # hardware_encoding=False forza libx264 (es. se NVENC dà problemi)
+        self.hardware_encoding = hardware_encoding
+        
+        # Pool per il rendering dei frame, creato al primo video
+        self._render_pool: Optional[ThreadPoolExecutor] = None
+        
+        # Parti statiche dei frame, rasterizzate una volta sola
+        width, height = FRAME_SIZE
+        self._background = np.full((height, width, 3), 255, dtype=np.uint8)
+        self._progress_bar = self._build_progress_bar()
+        self._text_masks: Dict[Tuple[str, int], np.ndarray] = {}
+        self._text_masks_lock = threading.Lock()  # I worker di _frame_arrays condividono la cache
+        # Font caricati una volta sola; in sola lettura, condivisi tra i thread
+        self._font, self._small_font = self._load_fonts()
     
     def _check_ffmpeg_availability(self) -> bool:
         """Verifica disponibilità FFmpeg."""
@@ -412,125 +887,323 @@ class RealVideoOutput:
             logger.warning("⚠️  FFmpeg non installato")
             return False
     
-    def frames_to_video(self, frames: List[Dict], output_name: str, 
+    def _hardware_encoder(self, backend: str) -> Optional[str]:
+        """h264_nvenc se si apre con il backend di codifica ('pyav' o 'ffmpeg')."""
+        if not self.hardware_encoding:
+            return None
+        if backend == 'pyav':
+            available = PYAV_AVAILABLE and _probe_nvenc('pyav')
+        else:
+            available = self.ffmpeg_available and _probe_nvenc('ffmpeg')
+        return 'h264_nvenc' if available else None
+    
+    def frames_to_video(self, frames: Iterable[Any], output_name: str, 
                        fps: int = 30, quality: str = "high") -> Dict[str, Any]:
-        """Converte sequenza di frame in video MP4."""
+        """Converte sequenza di frame in video MP4.
         
-        if not self.ffmpeg_available:
-            return self._fallback_video_generation(frames, output_name)
+        Con PyAV i frame vengono codificati in-process come array NumPy;
+        le liste lunghe sono divise in segmenti codificati in parallelo.
+        Senza PyAV sono inviati a FFmpeg su pipe (stream_frames_to_video).
+        """
+        
+        if not PYAV_AVAILABLE:
+            return self.stream_frames_to_video(frames, output_name, fps, quality)
+        
+        output_path = self.output_dir / f"{output_name}.mp4"
         
         try:
-            # Create temporary directory for frames
-            temp_dir = self.output_dir / f"temp_{hash(output_name)}"
-            temp_dir.mkdir(exist_ok=True)
-            
-            # Generate image frames from JSON data
-            frame_files = self._generate_image_frames(frames, temp_dir)
+            segments = self._segment_count(frames)
+            if segments > 1:
+                frames_count = self._encode_segments(frames, output_path, fps, quality, segments)
+            else:
+                frames_count = self._encode_pyav(frames, output_path, fps, quality)
             
-            if not frame_files:
+            if not frames_count:
                 return {"success": False, "error": "No frames generated"}
             
-            # FFmpeg command for video generation
-            output_path = self.output_dir / f"{output_name}.mp4"
+            return self._video_result(output_path, frames_count, fps, quality)
             
-            quality_settings = {
-                "low": ["-crf", "28"],
-                "medium": ["-crf", "23"],
-                "high": ["-crf", "18"],
-                "lossless": ["-crf", "0"]
-            }
+        except Exception as e:
+            logger.error(f"Video generation error: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def _encode_pyav(self, frames: Iterable[Any], output_path: Path, fps: int, quality: str,
+                     first_pts: int = 0, container_format: Optional[str] = None) -> int:
+        """Codifica i frame via PyAV (NVENC o libx264); restituisce il numero di frame.
+        
+        first_pts è l'indice del primo frame nel video completo: i segmenti
+        hanno così timestamp continui e si concatenano senza ricodifica.
+        """
+        width, height = FRAME_SIZE
+        frames_count = 0
+        
+        with av.open(str(output_path), mode='w', format=container_format) as container:
+            codec, options = self._encoder(quality)
+            stream = container.add_stream(codec, rate=fps)
+            stream.width = width
+            stream.height = height
+            stream.pix_fmt = 'yuv420p'
+            if container_format == 'mpegts':
+                # Niente B-frame: DTS == PTS, così i DTS dei segmenti non si sovrappongono
+                options["bf"] = "0"
+            stream.options = options
+            
+            for pts, array in enumerate(self._frame_arrays(frames), first_pts):
+                frame = av.VideoFrame.from_ndarray(array, format='rgb24')
+                frame.pts = pts
+                container.mux(stream.encode(frame))
+                frames_count += 1
+            
+            # Flush the encoder
+            container.mux(stream.encode())
+        
+        return frames_count
+    
+    def _segment_count(self, frames: Iterable[Any]) -> int:
+        """Numero di segmenti paralleli: uno ogni SEGMENT_MIN_FRAMES frame, al più un core ciascuno."""
+        # NVENC limita le sessioni di codifica concorrenti per GPU
+        if not isinstance(frames, Sequence) or self._hardware_encoder('pyav'):
+            return 1
+        return max(1, min(os.cpu_count() or 1, len(frames) // SEGMENT_MIN_FRAMES))
+    
+    def _encode_segments(self, frames: Sequence[Any], output_path: Path, fps: int,
+                         quality: str, segments: int) -> int:
+        """Codifica frames in segmenti MPEG-TS paralleli e li unisce in output_path."""
+        bounds = [len(frames) * i // segments for i in range(segments + 1)]
+        parts = [output_path.with_name(f"{output_path.stem}_part{i}.ts") for i in range(segments)]
+        
+        def encode_segment(i: int) -> int:
+            return self._encode_pyav(frames[bounds[i]:bounds[i + 1]], parts[i], fps, quality,
+                                     first_pts=bounds[i], container_format='mpegts')
+        
+        try:
+            with ThreadPoolExecutor(max_workers=segments) as pool:
+                frames_count = sum(pool.map(encode_segment, range(segments)))
+            self._concat_segments(parts, output_path)
+            return frames_count
+        finally:
+            for part in parts:
+                part.unlink(missing_ok=True)
+    
+    def _concat_segments(self, parts: List[Path], output_path: Path):
+        """Unisce i segmenti MPEG-TS in MP4 copiando i pacchetti (nessuna ricodifica)."""
+        source_url = "concat:" + "|".join(str(part) for part in parts)
+        
+        with av.open(source_url, format='mpegts') as source, \
+                av.open(str(output_path), mode='w') as target:
+            source_stream = source.streams.video[0]
+            target_stream = target.add_stream_from_template(source_stream)
+            
+            for packet in source.demux(source_stream):
+                # Skip the empty flush packets emitted by the demuxer
+                if packet.dts is None:
+                    continue
+                packet.stream = target_stream
+                target.mux(packet)
+    
+    def stream_frames_to_video(self, frames: Iterable[Any], output_name: str,
+                               fps: int = 30, quality: str = "high") -> Dict[str, Any]:
+        """Codifica i frame in MP4 inviandoli a FFmpeg come rawvideo su pipe.
+        
+        I frame (dati JSON, immagini PIL o array RGB uint8) vengono renderizzati
+        uno alla volta e scritti su stdin di FFmpeg: niente PNG intermedi su
+        disco. La risoluzione è quella del primo frame; tutti devono averla.
+        """
+        
+        if not self.ffmpeg_available:
+            return self._fallback_video_generation(list(frames), output_name)
+        
+        output_path = self.output_dir / f"{output_name}.mp4"
+        
+        try:
+            arrays = self._frame_arrays(frames)
+            first = next(arrays, None)
+            if first is None:
+                return {"success": False, "error": "No frames generated"}
+            
+            height, width = first.shape[:2]
             
+            # Errors only on stderr: it is read after stdin is closed
             cmd = [
                 "ffmpeg",
-                "-framerate", str(fps),
-                "-i", str(temp_dir / "frame_%04d.png"),
-                "-c:v", "libx264",
+                "-loglevel", "error", "-nostats",
+                "-f", "rawvideo",
+                "-pix_fmt", "rgb24",
+                "-s", f"{width}x{height}",
+                "-r", str(fps),
+                "-i", "pipe:0",
                 "-pix_fmt", "yuv420p"
-            ] + quality_settings.get(quality, quality_settings["medium"]) + [
+            ] + self._encoder_args(quality, 'ffmpeg') + [
                 str(output_path),
                 "-y"  # Overwrite existing
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            process = subprocess.Popen(
+                cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE, bufsize=1 << 20
+            )
             
-            # Cleanup temporary files
-            import shutil
-            shutil.rmtree(temp_dir, ignore_errors=True)
+            frames_count = 0
+            try:
+                for array in itertools.chain((first,), arrays):
+                    if array.shape != first.shape:
+                        raise ValueError(
+                            f"Frame {frames_count} has shape {array.shape}, "
+                            f"expected {first.shape} like the first frame"
+                        )
+                    process.stdin.write(array.data)
+                    frames_count += 1
+            except BaseException:
+                process.kill()
+                process.wait()
+                raise
+            finally:
+                process.stdin.close()
+            
+            stderr = process.stderr.read().decode(errors="replace")
+            returncode = process.wait()
+            
+            if returncode == 0 and frames_count:
+                return self._video_result(output_path, frames_count, fps, quality)
+            
+            logger.error(f"FFmpeg streaming failed: {stderr}")
+            return {"success": False, "error": stderr or "No frames generated"}
             
-            if result.returncode == 0:
-                return {
-                    "success": True,
-                    "video_path": str(output_path),
-                    "metadata": {
-                        "frames_count": len(frames),
-                        "fps": fps,
-                        "quality": quality,
-                        "duration": len(frames) / fps,
-                        "file_size": output_path.stat().st_size if output_path.exists() else 0
-                    }
-                }
-            else:
-                logger.error(f"FFmpeg failed: {result.stderr}")
-                return {"success": False, "error": result.stderr}
-                
         except Exception as e:
-            logger.error(f"Video generation error: {e}")
+            logger.error(f"Video streaming error: {e}")
             return {"success": False, "error": str(e)}
     
-    def _generate_image_frames(self, frames: List[Dict], output_dir: Path) -> List[Path]:
-        """Genera frame immagine da dati JSON."""
+    def _encoder_args(self, quality: str, backend: str) -> List[str]:
+        """Argomenti FFmpeg dell'encoder video: NVENC se backend lo apre, altrimenti libx264."""
+        settings = QUALITY_SETTINGS.get(quality, QUALITY_SETTINGS["medium"])
+        hardware_encoder = self._hardware_encoder(backend)
+        if hardware_encoder and quality != "lossless":
+            return ["-c:v", hardware_encoder] + NVENC_SETTINGS + ["-cq", settings[1]]
+        return ["-c:v", "libx264"] + settings
+    
+    def _encoder(self, quality: str) -> Tuple[str, Dict[str, str]]:
+        """Codec e opzioni di _encoder_args nel formato di PyAV."""
+        args = self._encoder_args(quality, 'pyav')
+        return args[1], {flag.lstrip('-'): value for flag, value in zip(args[2::2], args[3::2])}
+    
+    def _video_result(self, output_path: Path, frames_count: int, fps: int,
+                      quality: str) -> Dict[str, Any]:
+        """Risultato di una codifica riuscita."""
+        return {
+            "success": True,
+            "video_path": str(output_path),
+            "metadata": {
+                "frames_count": frames_count,
+                "fps": fps,
+                "quality": quality,
+                "duration": frames_count / fps,
+                "file_size": output_path.stat().st_size if output_path.exists() else 0
+            }
+        }
+    
+    def _frame_arrays(self, frames: Iterable[Any]) -> Iterator[np.ndarray]:
+        """Restituisce i frame come array RGB uint8, nell'ordine di ingresso.
+        
+        I frame JSON sono renderizzati in parallelo sul pool di thread mentre
+        l'encoder consuma i precedenti; al massimo 2 * cpu_count frame in volo.
+        """
+        if self._render_pool is None:
+            self._render_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+        
+        max_in_flight = 2 * (os.cpu_count() or 1)
+        pending = deque()
+        
+        for frame_data in frames:
+            pending.append(self._render_pool.submit(self._frame_array, frame_data))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        
+        while pending:
+            yield pending.popleft().result()
+    
+    def _frame_array(self, frame_data: Any) -> np.ndarray:
+        """Converte un frame (dati JSON, immagine PIL o array RGB) in array contiguo uint8."""
+        if isinstance(frame_data, Image.Image):
+            return np.asarray(frame_data.convert('RGB'))
+        if isinstance(frame_data, np.ndarray):
+            if frame_data.ndim != 3 or frame_data.shape[2] != 3:
+                raise ValueError(f"Expected an RGB frame of shape (height, width, 3), got {frame_data.shape}")
+            return np.ascontiguousarray(frame_data, dtype=np.uint8)
+        return self._render_frame(frame_data, self._font, self._small_font)
+    
+    def _load_fonts(self) -> Tuple[Any, Any]:
+        """Carica i font per il rendering dei frame (font e small_font)."""
         try:
-            from PIL import Image, ImageDraw, ImageFont
-            
-            frame_files = []
-            
-            for i, frame_data in enumerate(frames):
-                # Create image
-                img = Image.new('RGB', (1920, 1080), color='white')
-                draw = ImageDraw.Draw(img)
-                
-                try:
-                    font = ImageFont.truetype("arial.ttf", 48)
-                    small_font = ImageFont.truetype("arial.ttf", 24)
-                except:
-                    font = ImageFont.load_default()
-                    small_font = ImageFont.load_default()
+            return ImageFont.truetype("arial.ttf", 48), ImageFont.truetype("arial.ttf", 24)
+        except OSError:
+            return ImageFont.load_default(), ImageFont.load_default()
+    
+    def _render_frame(self, frame_data: Any, font: Any, small_font: Any) -> np.ndarray:
+        """Renderizza un frame JSON come array RGB uint8.
+        
+        Parte da una copia dello sfondo bianco e rasterizza solo le parti
+        variabili: il testo (maschere in cache) e la barra di avanzamento.
+        """
+        frame = self._background.copy()
+        
+        # Draw frame content
+        if isinstance(frame_data, dict):
+            if 'content' in frame_data:
+                content = frame_data['content']
+                if 'expression' in content:
+                    self._blit_text(frame, (100, 200), f"Expression: {content['expression']}",
+                                    font, TEXT_COLOR)
                 
-                # Draw frame content
-                if isinstance(frame_data, dict):
-                    if 'content' in frame_data:
-                        content = frame_data['content']
-                        if 'expression' in content:
-                            draw.text((100, 200), f"Expression: {content['expression']}", 
-                                    fill='black', font=font)
-                        
-                        if 'analysis' in content:
-                            draw.text((100, 300), f"Analysis: {content['analysis']}", 
-                                    fill='blue', font=small_font)
-                        
-                        if 'progress' in content:
-                            progress = content['progress']
-                            # Draw progress bar
-                            bar_width = 800
-                            bar_height = 20
-                            bar_x = 100
-                            bar_y = 400
-                            
-                            draw.rectangle([bar_x, bar_y, bar_x + bar_width, bar_y + bar_height], 
-                                         outline='black', fill='lightgray')
-                            draw.rectangle([bar_x, bar_y, bar_x + int(bar_width * progress), bar_y + bar_height], 
-                                         fill='green')
+                if 'analysis' in content:
+                    self._blit_text(frame, (100, 300), f"Analysis: {content['analysis']}",
+                                    small_font, ANALYSIS_COLOR)
                 
-                # Save frame
-                frame_file = output_dir / f"frame_{i:04d}.png"
-                img.save(frame_file)
-                frame_files.append(frame_file)
-            
-            return frame_files
+                if 'progress' in content:
+                    x, y = PROGRESS_BAR_ORIGIN
+                    width, height = PROGRESS_BAR_SIZE
+                    filled = int(width * content['progress'])
+                    
+                    frame[y:y + height + 1, x:x + width + 1] = self._progress_bar
+                    frame[y:y + height + 1, x:x + filled + 1] = PROGRESS_COLOR
+        
+        return frame
+    
+    def _blit_text(self, frame: np.ndarray, origin: Tuple[int, int], text: str,
+                   font: Any, color: Tuple[int, int, int]):
+        """Disegna text su frame fondendo la sua maschera antialias con il colore."""
+        mask = self._text_mask(text, font)
+        x, y = origin
+        region = frame[y:y + mask.shape[0], x:x + mask.shape[1]]
+        mask = mask[:region.shape[0], :region.shape[1], None].astype(np.uint16)
+        
+        region[...] = (region * (255 - mask) + np.array(color, np.uint16) * mask + 127) // 255
+    
+    def _text_mask(self, text: str, font: Any) -> np.ndarray:
+        """Maschera di copertura (uint8) del testo, in cache per (testo, font)."""
+        key = (text, id(font))
+        with self._text_masks_lock:
+            mask = self._text_masks.get(key)
+        
+        if mask is None:
+            # Rasterizzazione fuori dal lock; due thread possono calcolare la stessa maschera
+            _, _, right, bottom = font.getbbox(text)
+            image = Image.new('L', (max(right, 1), max(bottom, 1)), 0)
+            ImageDraw.Draw(image).text((0, 0), text, fill=255, font=font)
+            mask = np.asarray(image)
             
-        except Exception as e:
-            logger.error(f"Error generating image frames: {e}")
-            return []
+            with self._text_masks_lock:
+                if key not in self._text_masks and len(self._text_masks) >= TEXT_MASK_CACHE_SIZE:
+                    del self._text_masks[next(iter(self._text_masks))]
+                self._text_masks[key] = mask
+        
+        return mask
+    
+    def _build_progress_bar(self) -> np.ndarray:
+        """Barra di avanzamento vuota (bordo nero, riempimento grigio chiaro)."""
+        width, height = PROGRESS_BAR_SIZE
+        image = Image.new('RGB', (width + 1, height + 1), color='white')
+        ImageDraw.Draw(image).rectangle([0, 0, width, height], outline='black', fill='lightgray')
+        return np.asarray(image)
     
     def _fallback_video_generation(self, frames: List[Dict], output_name: str) -> Dict[str, Any]:
         """Fallback quando FFmpeg non è disponibile."""
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Reduce Worker
+Funzioni eseguite nei processi del pool CPU di ProductionLambdaVisualizer.
+Modulo minimo: i worker lo importano da soli, senza server, Manim, CuPy o PyAV.
+"""
+
+import os
+from typing import Dict, Any
+
+from .complete_beta_reduction import (
+    BetaReducer, LambdaParser, ReductionStrategy, warm_up_fast_reducer
+)
+
+def reduce_worker(expression: str, max_steps: int, strategy: str,
+                  fast: bool = False) -> Dict[str, Any]:
+    """Parsa e riduce un'espressione in un processo del pool CPU."""
+
+    term = LambdaParser().parse(expression)
+    reducer = BetaReducer(ReductionStrategy(strategy))
+    if fast:
+        return reducer.reduce_fast(term, max_steps=max_steps)
+    return reducer.reduce(term, max_steps=max_steps)
+
+def init_reduce_worker(worker_counter, warm_up: bool):
+    """Inizializza un processo del pool: lo fissa a un core e compila reduce_fast."""
+
+    if hasattr(os, 'sched_setaffinity'):
+        with worker_counter.get_lock():
+            worker_index = worker_counter.value
+            worker_counter.value += 1
+        cores = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cores[worker_index % len(cores)]})
+
+    if warm_up:
+        warm_up_fast_reducer()
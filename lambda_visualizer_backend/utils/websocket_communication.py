@@ -6,6 +6,7 @@ Risolve la criticità 3.5: Comunicazione Basata su Polling.
 """
 
 import asyncio
+import sys
 import json
 import uuid
 import time
@@ -17,6 +18,12 @@ import logging
 import threading
 from pathlib import Path
 
+# Eseguito come script (python utils/...): utils si importa dalla directory del backend
+if not __package__:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.json_encoding import json_dumps, json_loads
+
 # WebSocket dependencies
 try:
     import websockets
@@ -51,6 +58,7 @@ class MessageType(Enum):
     
     # Server to Client
     JOB_UPDATE = "job_update"
+    JOB_UPDATE_BATCH = "job_update_batch"
     JOB_COMPLETED = "job_completed"
     JOB_FAILED = "job_failed"
     SYSTEM_UPDATE = "system_update"
@@ -167,7 +175,7 @@ class WebSocketManager:
         """Gestisce un messaggio ricevuto da un client."""
         
         try:
-            data = json.loads(message)
+            data = json_loads(message)
             
             # Validate message structure
             if not all(key in data for key in ['type', 'data']):
@@ -224,7 +232,7 @@ class WebSocketManager:
             message["subscription_id"] = subscription_id
         
         try:
-            await client.websocket.send(json.dumps(message))
+            await client.websocket.send(json_dumps(message))
         except Exception as e:
             logger.error(f"Error sending to client {client_id}: {e}")
             await self.remove_client(client_id)
@@ -378,6 +386,69 @@ class WebSocketManager:
             except Exception as e:
                 logger.error(f"Error in heartbeat loop: {e}")
 
+class ProgressNotifier:
+    """Coalesce gli aggiornamenti di avanzamento dei job.
+    
+    Gli stati vengono accumulati per client e inviati ogni `interval` secondi
+    in un solo messaggio JOB_UPDATE_BATCH con l'ultimo stato di ciascun job.
+    Va usato dal thread dell'event loop. Il lock copre invio e discard: dopo
+    `await discard(...)` nessun batch con quel job è ancora in volo.
+    """
+    
+    def __init__(self, manager: WebSocketManager, interval: float = 0.1):
+        self.manager = manager
+        self.interval = interval
+        self._pending: Dict[str, Dict[str, Dict[str, Any]]] = {}  # client_id -> job_id -> stato
+        self._flush_task = None
+        self._send_lock = asyncio.Lock()
+    
+    def stage(self, client_id: str, job_id: str, status: str, progress: float):
+        """Registra l'ultimo stato di un job; l'invio avviene al prossimo tick."""
+        
+        self._pending.setdefault(client_id, {})[job_id] = {
+            "job_id": job_id,
+            "status": status,
+            "progress": progress
+        }
+        
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def discard(self, client_id: str, job_id: str):
+        """Scarta lo stato in attesa di un job (prima di un messaggio terminale).
+        
+        Attende l'eventuale batch già in invio: il messaggio terminale inviato
+        dopo non può essere superato da un avanzamento vecchio.
+        """
+        
+        async with self._send_lock:
+            jobs = self._pending.get(client_id)
+            if jobs:
+                jobs.pop(job_id, None)
+                if not jobs:
+                    del self._pending[client_id]
+    
+    async def flush(self):
+        """Invia subito gli stati in attesa, un messaggio per client."""
+        
+        async with self._send_lock:
+            pending, self._pending = self._pending, {}
+            
+            for client_id, jobs in pending.items():
+                await self.manager.send_to_client(client_id, MessageType.JOB_UPDATE_BATCH, {
+                    "jobs": list(jobs.values())
+                })
+    
+    async def _flush_loop(self):
+        """Tick di invio: termina quando non ci sono più stati in attesa."""
+        
+        try:
+            while self._pending:
+                await asyncio.sleep(self.interval)
+                await self.flush()
+        finally:
+            self._flush_task = None
+
 class LambdaVisualizerWebSocketServer:
     """Server WebSocket per Lambda Visualizer."""
     